@@ -1,28 +1,62 @@
 import asyncio
+import os
+import socket
 import time
 import uvicorn
 
-from multiprocessing import Process, Queue
+from multiprocessing import Process
+
+from config import CLEANER_PROCESSES, CLEANER_TASKS, RAW_ARCHIVE_DIR
+from engine.archive import RawArchive
 from engine.chart_generator import ChartGenerator
+from engine.orchestrator import ScrapeJob, ScrapeOrchestrator
 from engine.scrapers import GoogleJobsScraper, LinkedInScraper
 from engine.cleaner import Cleaner
+from engine.transport import RedisStreamTransport
+
+
+SCRAPE_JOBS: list[ScrapeJob] = [
+    ScrapeJob(
+        scraper=GoogleJobsScraper,
+        url="https://www.google.com/search?q=software%20engineer%20internship&oq=software%20engineer%20internship%20&gs_lcrp=EgZjaHJvbWUqBggAEEUYOzIGCAAQRRg7MgYIARBFGDsyBwgCEAAYgAQyBwgDEAAYgAQyBggEEEUYQTIGCAUQRRg8MgYIBhBFGEEyBggHEC4YQNIBCDYwNjRqMGoxqAIIsAIB8QX4SipSyeWHlg&sourceid=chrome&ie=UTF-8&jbr=sep:0&udm=8&ved=2ahUKEwi_4-C6u_SMAxV3zwIHHdJJGO8Q3L8LegQIIxAN#vhid=vt%3D20/docid%3DSCXfdu4XPPzq7xj9AAAAAA%3D%3D&vssid=jobs-detail-viewer",
+        interval=60 * 60,
+    ),
+    ScrapeJob(
+        scraper=LinkedInScraper,
+        url="https://www.linkedin.com/jobs/search/?keywords=software%20engineer&location=London%2C%20England%2C%20United%20Kingdom",
+        interval=60 * 60,
+    ),
+]
 
 
 def run_server() -> None:
     uvicorn.run("app:app", port=8000)
 
 
-def run_scraper(queue: Queue) -> None:
-    asyncio.run(
-        GoogleJobsScraper(
-            "https://www.google.com/search?q=software%20engineer%20internship&oq=software%20engineer%20internship%20&gs_lcrp=EgZjaHJvbWUqBggAEEUYOzIGCAAQRRg7MgYIARBFGDsyBwgCEAAYgAQyBwgDEAAYgAQyBggEEEUYQTIGCAUQRRg8MgYIBhBFGEEyBggHEC4YQNIBCDYwNjRqMGoxqAIIsAIB8QX4SipSyeWHlg&sourceid=chrome&ie=UTF-8&jbr=sep:0&udm=8&ved=2ahUKEwi_4-C6u_SMAxV3zwIHHdJJGO8Q3L8LegQIIxAN#vhid=vt%3D20/docid%3DSCXfdu4XPPzq7xj9AAAAAA%3D%3D&vssid=jobs-detail-viewer",
-            queue,
-        ).run()
+def run_scraper() -> None:
+    asyncio.run(ScrapeOrchestrator(SCRAPE_JOBS, RedisStreamTransport()).run())
+
+
+async def run_cleaners(tasks: int) -> None:
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    await asyncio.gather(
+        *(
+            Cleaner(
+                RedisStreamTransport(consumer=f"{prefix}-{i}"),
+                name=f"{prefix}-{i}",
+                archive=(
+                    RawArchive(RAW_ARCHIVE_DIR, prefix=f"{prefix}-{i}")
+                    if RAW_ARCHIVE_DIR
+                    else None
+                ),
+            ).run()
+            for i in range(tasks)
+        )
     )
 
 
-def run_cleaner(queue: Queue) -> None:
-    asyncio.run(Cleaner(queue).run())
+def run_cleaner(tasks: int) -> None:
+    asyncio.run(run_cleaners(tasks))
 
 
 def run_chart_generator() -> None:
@@ -30,12 +64,13 @@ def run_chart_generator() -> None:
 
 
 def main() -> None:
-    queue = Queue()
-
     process_kwargs = (
         # {"target": run_server, "args": (), "name": "server"},
-        {"target": run_scraper, "args": (queue,), "name": "scraper"},
-        {"target": run_cleaner, "args": (queue,), "name": "cleaner"},
+        {"target": run_scraper, "args": (), "name": "scraper"},
+        *(
+            {"target": run_cleaner, "args": (CLEANER_TASKS,), "name": f"cleaner-{i}"}
+            for i in range(CLEANER_PROCESSES)
+        ),
         # {"target": run_chart_generator, "args": (), "name": "chart_generator"},
     )
 
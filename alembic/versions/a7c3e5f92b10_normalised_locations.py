@@ -0,0 +1,278 @@
+"""Normalised locations
+
+Revision ID: a7c3e5f92b10
+Revises: f5c9e1a27d64
+Create Date: 2026-10-17 18:22:41.870312
+
+"""
+import re
+from typing import NamedTuple, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f92b10'
+down_revision: Union[str, None] = 'f5c9e1a27d64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# engine.locations.parse_location at the time of writing, frozen so later
+# changes to the gazetteer don't change what this migration does
+UNITED_KINGDOM = "United Kingdom"
+UNITED_STATES = "United States"
+
+COUNTRY_ALIASES: dict[str, str] = {
+    "uk": UNITED_KINGDOM,
+    "u.k.": UNITED_KINGDOM,
+    "gb": UNITED_KINGDOM,
+    "great britain": UNITED_KINGDOM,
+    "united kingdom": UNITED_KINGDOM,
+    "us": UNITED_STATES,
+    "usa": UNITED_STATES,
+    "u.s.": UNITED_STATES,
+    "united states": UNITED_STATES,
+    "united states of america": UNITED_STATES,
+    "ireland": "Ireland",
+    "germany": "Germany",
+    "france": "France",
+    "netherlands": "Netherlands",
+}
+
+REGIONS: dict[str, tuple[str, str]] = {
+    "england": ("England", UNITED_KINGDOM),
+    "scotland": ("Scotland", UNITED_KINGDOM),
+    "wales": ("Wales", UNITED_KINGDOM),
+    "northern ireland": ("Northern Ireland", UNITED_KINGDOM),
+}
+
+# Cities whose region and country are filled in when a posting omits them
+CITIES: dict[str, tuple[str, str, str]] = {
+    "london": ("London", "England", UNITED_KINGDOM),
+    "manchester": ("Manchester", "England", UNITED_KINGDOM),
+    "birmingham": ("Birmingham", "England", UNITED_KINGDOM),
+    "leeds": ("Leeds", "England", UNITED_KINGDOM),
+    "bristol": ("Bristol", "England", UNITED_KINGDOM),
+    "cambridge": ("Cambridge", "England", UNITED_KINGDOM),
+    "oxford": ("Oxford", "England", UNITED_KINGDOM),
+    "reading": ("Reading", "England", UNITED_KINGDOM),
+    "brighton": ("Brighton", "England", UNITED_KINGDOM),
+    "newcastle upon tyne": ("Newcastle upon Tyne", "England", UNITED_KINGDOM),
+    "sheffield": ("Sheffield", "England", UNITED_KINGDOM),
+    "nottingham": ("Nottingham", "England", UNITED_KINGDOM),
+    "liverpool": ("Liverpool", "England", UNITED_KINGDOM),
+    "edinburgh": ("Edinburgh", "Scotland", UNITED_KINGDOM),
+    "glasgow": ("Glasgow", "Scotland", UNITED_KINGDOM),
+    "cardiff": ("Cardiff", "Wales", UNITED_KINGDOM),
+    "belfast": ("Belfast", "Northern Ireland", UNITED_KINGDOM),
+    "dublin": ("Dublin", "Leinster", "Ireland"),
+}
+
+WORK_MODE_PATTERNS: tuple[tuple[str, re.Pattern], ...] = (
+    ("hybrid", re.compile(r"\bhybrid\b")),
+    ("remote", re.compile(r"\b(remote|work from home|wfh)\b")),
+    ("onsite", re.compile(r"\b(on-?site|in[- ]office)\b")),
+)
+
+SEPARATOR_PATTERN = re.compile(r"[,/|·•]|\s[-–]\s")
+
+# "(+3 others)", "(Hybrid)", "Greater London Area" and the like
+NOISE_PATTERN = re.compile(
+    r"\([^)]*\)|\b(greater|city of|area|metropolitan|hybrid|remote|on-?site|"
+    r"in[- ]office|work from home|wfh)\b"
+)
+
+
+class ParsedLocation(NamedTuple):
+    city: Optional[str]
+    region: Optional[str]
+    country: Optional[str]
+    work_mode: Optional[str]
+
+    @property
+    def key(self) -> str:
+        return "|".join(part or "" for part in (self.city, self.region, self.country))
+
+    @property
+    def is_empty(self) -> bool:
+        return self.city is None and self.region is None and self.country is None
+
+
+def parse_location(raw: str) -> ParsedLocation:
+    text: str = raw.strip().lower()
+
+    work_mode: Optional[str] = next(
+        (mode for mode, pattern in WORK_MODE_PATTERNS if pattern.search(text)), None
+    )
+
+    city = region = country = None
+    parts: list[str] = [
+        " ".join(part.split()).strip(" -")
+        for part in SEPARATOR_PATTERN.split(NOISE_PATTERN.sub(" ", text))
+    ]
+
+    for part in filter(None, parts):
+        if part in COUNTRY_ALIASES:
+            country = COUNTRY_ALIASES[part]
+        elif part in REGIONS:
+            region, country = REGIONS[part][0], country or REGIONS[part][1]
+        elif part in CITIES:
+            city, region, country = CITIES[part]
+        elif city is None:
+            city = part.title()
+
+    return ParsedLocation(city, region, country, work_mode)
+
+
+# engine.quantile_sketch.GAMMA at the time of writing, (1 + 0.01) / (1 - 0.01)
+GAMMA = 1.01 / 0.99
+
+# Rollup tables, the column they're keyed on and the rows they're built from
+ROLLUPS: dict[str, tuple[str, str]] = {
+    'industry_salary_stats': (
+        'industry',
+        """
+        SELECT industry AS name, {location} AS location, salary
+        FROM cleaned_data
+        WHERE industry IS NOT NULL AND salary > 0
+        """,
+    ),
+    'language_salary_stats': (
+        'language',
+        """
+        SELECT DISTINCT cleaned_data.id, lower(lang) AS name, {location} AS location, salary
+        FROM cleaned_data
+        CROSS JOIN LATERAL unnest(programming_languages) AS lang
+        WHERE salary > 0
+        """,
+    ),
+}
+
+
+def rebuild_rollup(table: str, location: str, all_locations: str) -> None:
+    key, source = ROLLUPS[table]
+    op.execute(
+        f"""
+        INSERT INTO {table} ({key}, {location}, count, salary_sum, sketch)
+        WITH salaried AS ({source.format(location=location)}),
+        expanded AS (
+            SELECT name, location, salary FROM salaried WHERE location IS NOT NULL
+            UNION ALL
+            SELECT name, {all_locations}, salary FROM salaried
+        ),
+        buckets AS (
+            SELECT name, location, ceil(ln(salary) / ln({GAMMA}))::int AS bucket,
+                   count(*) AS n, sum(salary) AS total
+            FROM expanded
+            GROUP BY 1, 2, 3
+        )
+        SELECT name, location, sum(n), sum(total), jsonb_object_agg(bucket, n)
+        FROM buckets
+        GROUP BY name, location
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('locations',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=True),
+    sa.Column('region', sa.String(), nullable=True),
+    sa.Column('country', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_table('location_aliases',
+    sa.Column('raw', sa.String(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=True),
+    sa.Column('work_mode', sa.String(length=8), nullable=True),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+    sa.PrimaryKeyConstraint('raw')
+    )
+    op.create_index(op.f('ix_location_aliases_location_id'), 'location_aliases', ['location_id'], unique=False)
+    op.add_column('cleaned_data', sa.Column('location_id', sa.Integer(), nullable=True))
+    op.add_column('cleaned_data', sa.Column('work_mode', sa.String(length=8), nullable=True))
+    op.create_index(op.f('ix_cleaned_data_location_id'), 'cleaned_data', ['location_id'], unique=False)
+    op.create_foreign_key(None, 'cleaned_data', 'locations', ['location_id'], ['id'])
+    # ### end Alembic commands ###
+
+    # Each distinct raw location is parsed once, rows then pick up their
+    # location through the alias table
+    conn = op.get_bind()
+    raws: list[str] = conn.execute(
+        sa.text('SELECT DISTINCT location FROM cleaned_data')
+    ).scalars().all()
+    parsed = {raw: parse_location(raw) for raw in raws}
+
+    places = {p.key: p for p in parsed.values() if not p.is_empty}
+    if places:
+        conn.execute(
+            sa.text(
+                'INSERT INTO locations (key, city, region, country) '
+                'VALUES (:key, :city, :region, :country)'
+            ),
+            [
+                {'key': key, 'city': p.city, 'region': p.region, 'country': p.country}
+                for key, p in sorted(places.items())
+            ],
+        )
+    if parsed:
+        conn.execute(
+            sa.text(
+                'INSERT INTO location_aliases (raw, location_id, work_mode) '
+                'SELECT :raw, (SELECT id FROM locations WHERE key = :key), :work_mode'
+            ),
+            [
+                {'raw': raw, 'key': p.key, 'work_mode': p.work_mode}
+                for raw, p in parsed.items()
+            ],
+        )
+
+    op.execute(
+        """
+        UPDATE cleaned_data
+        SET location_id = location_aliases.location_id,
+            work_mode = location_aliases.work_mode
+        FROM location_aliases
+        WHERE location_aliases.raw = cleaned_data.location
+        """
+    )
+
+    # Rollups are rebuilt keyed on location_id, 0 holding the stats
+    # across every location
+    for table, (key, _) in ROLLUPS.items():
+        op.execute(f'TRUNCATE {table}')
+        op.drop_index(f'ix_{table}_location_count', table_name=table)
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.drop_column(table, 'location')
+        op.add_column(table, sa.Column('location_id', sa.Integer(), nullable=False))
+        op.create_primary_key(f'{table}_pkey', table, [key, 'location_id'])
+        op.create_index(f'ix_{table}_location_id_count', table, ['location_id', 'count'], unique=False)
+        rebuild_rollup(table, 'location_id', '0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, (key, _) in ROLLUPS.items():
+        op.execute(f'TRUNCATE {table}')
+        op.drop_index(f'ix_{table}_location_id_count', table_name=table)
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.drop_column(table, 'location_id')
+        op.add_column(table, sa.Column('location', sa.String(), nullable=False))
+        op.create_primary_key(f'{table}_pkey', table, [key, 'location'])
+        op.create_index(f'ix_{table}_location_count', table, ['location', 'count'], unique=False)
+        rebuild_rollup(table, 'location', "'*'")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_constraint('cleaned_data_location_id_fkey', 'cleaned_data', type_='foreignkey')
+    op.drop_index(op.f('ix_cleaned_data_location_id'), table_name='cleaned_data')
+    op.drop_column('cleaned_data', 'work_mode')
+    op.drop_column('cleaned_data', 'location_id')
+    op.drop_index(op.f('ix_location_aliases_location_id'), table_name='location_aliases')
+    op.drop_table('location_aliases')
+    op.drop_table('locations')
+    # ### end Alembic commands ###
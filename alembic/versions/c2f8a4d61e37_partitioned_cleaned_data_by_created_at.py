@@ -0,0 +1,140 @@
+"""Partitioned cleaned data by created at
+
+Revision ID: c2f8a4d61e37
+Revises: a7c3e5f92b10
+Create Date: 2026-10-17 19:04:12.316480
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8a4d61e37'
+down_revision: Union[str, None] = 'a7c3e5f92b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# config.CLEANED_DATA_PARTITIONS_AHEAD at the time of writing, later
+# months are created by utils.partitions.ensure_partitions
+PARTITIONS_AHEAD = 3
+
+COLUMNS = (
+    'id, url, title, company, industry, salary, currency, location, location_id, '
+    'work_mode, programming_languages, responsibilities, requirements, extras, '
+    'created_at'
+)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def columns(partitioned: bool) -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('cleaned_data_id_seq'::regclass)"), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('company', sa.String(), nullable=False),
+        sa.Column('industry', sa.String(), nullable=True),
+        sa.Column('salary', sa.Integer(), nullable=True),
+        sa.Column('currency', sa.String(length=3), nullable=True),
+        sa.Column('location', sa.String(), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=True),
+        sa.Column('work_mode', sa.String(length=8), nullable=True),
+        sa.Column('programming_languages', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('responsibilities', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('requirements', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('extras', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=not partitioned),
+    ]
+
+
+def swap(new_table: str) -> None:
+    """Replaces cleaned_data with `new_table`, keeping the id sequence."""
+    op.execute('ALTER SEQUENCE cleaned_data_id_seq OWNED BY NONE')
+    op.drop_table('cleaned_data')
+    op.rename_table(new_table, 'cleaned_data')
+    op.execute('ALTER SEQUENCE cleaned_data_id_seq OWNED BY cleaned_data.id')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Urls are deduplicated here as a unique index on a partitioned table
+    # has to include the partition key
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('cleaned_data_urls',
+    sa.Column('url', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('url')
+    )
+    # ### end Alembic commands ###
+    op.execute('INSERT INTO cleaned_data_urls (url) SELECT url FROM cleaned_data')
+
+    op.create_table(
+        'cleaned_data_partitioned',
+        *columns(partitioned=True),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text('SELECT min(created_at) FROM cleaned_data')).scalar()
+    this_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start = (oldest or this_month).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = add_months(this_month, PARTITIONS_AHEAD + 1)
+
+    while start < end:
+        following = add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE cleaned_data_y{start:%Y}m{start:%m} "
+            f"PARTITION OF cleaned_data_partitioned "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        )
+        start = following
+    op.execute('CREATE TABLE cleaned_data_default PARTITION OF cleaned_data_partitioned DEFAULT')
+
+    # Rows from before created_at was always set are dated to the migration
+    op.execute(
+        f"""
+        INSERT INTO cleaned_data_partitioned ({COLUMNS})
+        SELECT {COLUMNS.replace('created_at', 'coalesce(created_at, localtimestamp)')}
+        FROM cleaned_data
+        """
+    )
+    swap('cleaned_data_partitioned')
+
+    # Indexes are built once the rows are in and cascade to every partition
+    op.create_primary_key('cleaned_data_pkey', 'cleaned_data', ['id', 'created_at'])
+    op.create_foreign_key('cleaned_data_location_id_fkey', 'cleaned_data', 'locations', ['location_id'], ['id'])
+    op.create_index('ix_cleaned_data_created_at', 'cleaned_data', ['created_at'], unique=False)
+    op.create_index('ix_cleaned_data_location_id', 'cleaned_data', ['location_id'], unique=False)
+    op.create_index('ix_cleaned_data_programming_languages', 'cleaned_data', ['programming_languages'], unique=False, postgresql_using='gin')
+    op.create_index('ix_cleaned_data_industry', 'cleaned_data', ['industry'], unique=False)
+    op.execute('ANALYZE cleaned_data')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('cleaned_data_unpartitioned', *columns(partitioned=False))
+    op.execute(
+        f"""
+        INSERT INTO cleaned_data_unpartitioned ({COLUMNS})
+        SELECT {COLUMNS} FROM cleaned_data
+        """
+    )
+    swap('cleaned_data_unpartitioned')
+
+    op.create_primary_key('cleaned_data_pkey', 'cleaned_data', ['id'])
+    op.create_unique_constraint('cleaned_data_url_key', 'cleaned_data', ['url'])
+    op.create_foreign_key('cleaned_data_location_id_fkey', 'cleaned_data', 'locations', ['location_id'], ['id'])
+    op.create_index('ix_cleaned_data_created_at', 'cleaned_data', ['created_at'], unique=False)
+    op.create_index('ix_cleaned_data_location_id', 'cleaned_data', ['location_id'], unique=False)
+    op.create_index('ix_cleaned_data_programming_languages', 'cleaned_data', ['programming_languages'], unique=False, postgresql_using='gin')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('cleaned_data_urls')
+    # ### end Alembic commands ###
@@ -0,0 +1,65 @@
+"""Converted list fields to text arrays
+
+Revision ID: c4e7a9d15b28
+Revises: b8d4f2a61c03
+Create Date: 2026-10-17 15:21:09.874310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a9d15b28'
+down_revision: Union[str, None] = 'b8d4f2a61c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES: tuple[str, ...] = ('scraped_data', 'cleaned_data')
+COLUMNS: tuple[tuple[str, bool], ...] = (
+    ('programming_languages', False),
+    ('responsibilities', True),
+    ('requirements', False),
+    ('extras', True),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # USING doesn't accept subqueries, the JSON arrays are unpacked
+    # through a temporary function instead
+    op.execute(
+        """
+        CREATE FUNCTION json_to_text_array(value text) RETURNS text[]
+        LANGUAGE sql IMMUTABLE STRICT
+        AS $$ SELECT coalesce(array_agg(e), '{}') FROM json_array_elements_text(value::json) AS e $$
+        """
+    )
+
+    for table in TABLES:
+        for column, nullable in COLUMNS:
+            op.alter_column(table, column,
+                       existing_type=sa.VARCHAR(),
+                       type_=postgresql.ARRAY(sa.String()),
+                       existing_nullable=nullable,
+                       postgresql_using=f'json_to_text_array({column})')
+
+    op.execute('DROP FUNCTION json_to_text_array(text)')
+
+    op.create_index('ix_cleaned_data_programming_languages', 'cleaned_data', ['programming_languages'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cleaned_data_programming_languages', table_name='cleaned_data', postgresql_using='gin')
+
+    for table in TABLES:
+        for column, nullable in COLUMNS:
+            op.alter_column(table, column,
+                       existing_type=postgresql.ARRAY(sa.String()),
+                       type_=sa.VARCHAR(),
+                       existing_nullable=nullable,
+                       postgresql_using=f'array_to_json({column})::text')
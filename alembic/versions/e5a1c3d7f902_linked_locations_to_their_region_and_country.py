@@ -0,0 +1,163 @@
+"""Linked locations to their region and country
+
+Revision ID: e5a1c3d7f902
+Revises: d8b2e6f0a913
+Create Date: 2026-10-17 21:02:17.553109
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c3d7f902'
+down_revision: Union[str, None] = 'd8b2e6f0a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# engine.quantile_sketch.GAMMA at the time of writing, (1 + 0.01) / (1 - 0.01)
+GAMMA = 1.01 / 0.99
+
+# engine.utils.LANGUAGE_ALIASES at the time of writing
+LANGUAGE_ALIASES = {'javascript': 'typescript', 'golang': 'go'}
+
+ALIAS_CASES = ' '.join(
+    f"WHEN '{alias}' THEN '{name}'" for alias, name in LANGUAGE_ALIASES.items()
+)
+
+# Rollup tables, the column they're keyed on and the rows they're built from
+ROLLUPS: dict[str, tuple[str, str]] = {
+    'industry_salary_stats': (
+        'industry',
+        """
+        SELECT industry AS name, location_id AS location, salary
+        FROM cleaned_data
+        WHERE industry IS NOT NULL AND salary > 0
+        """,
+    ),
+    'language_salary_stats': (
+        'language',
+        f"""
+        SELECT DISTINCT cleaned_data.id, names.name, location_id AS location, salary
+        FROM cleaned_data
+        CROSS JOIN LATERAL unnest(programming_languages) AS lang
+        CROSS JOIN LATERAL (
+            VALUES (lower(lang)), (CASE lower(lang) {ALIAS_CASES} END)
+        ) AS names (name)
+        WHERE salary > 0 AND names.name IS NOT NULL
+        """,
+    ),
+}
+
+# Each location alongside itself and every location containing it
+LINEAGE = """
+    SELECT id AS location, id AS rollup_location FROM locations
+    UNION ALL
+    SELECT id, parent_id FROM locations WHERE parent_id IS NOT NULL
+    UNION ALL
+    SELECT child.id, parent.parent_id
+    FROM locations AS child
+    JOIN locations AS parent ON parent.id = child.parent_id
+    WHERE parent.parent_id IS NOT NULL
+"""
+
+# The lineage of a location before they were linked
+SELF = 'SELECT id AS location, id AS rollup_location FROM locations'
+
+
+def rebuild_rollup(table: str, lineage: str) -> None:
+    key, source = ROLLUPS[table]
+    op.execute(f'TRUNCATE {table}')
+    op.execute(
+        f"""
+        INSERT INTO {table} ({key}, location_id, count, salary_sum, sketch)
+        WITH salaried AS ({source}),
+        lineage AS ({lineage}),
+        expanded AS (
+            SELECT name, rollup_location AS location, salary
+            FROM salaried
+            JOIN lineage USING (location)
+            UNION ALL
+            SELECT name, 0, salary FROM salaried
+        ),
+        buckets AS (
+            SELECT name, location, ceil(ln(salary) / ln({GAMMA}))::int AS bucket,
+                   count(*) AS n, sum(salary) AS total
+            FROM expanded
+            GROUP BY 1, 2, 3
+        )
+        SELECT name, location, sum(n), sum(total), jsonb_object_agg(bucket, n)
+        FROM buckets
+        GROUP BY name, location
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('locations', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('locations_parent_id_fkey', 'locations', 'locations', ['parent_id'], ['id'])
+    # ### end Alembic commands ###
+
+    # Regions of cities and countries of regions and cities, keyed the
+    # way engine.locations.ParsedLocation keys them
+    op.execute(
+        """
+        INSERT INTO locations (key, region, country)
+        SELECT DISTINCT '|' || region || '|' || coalesce(country, ''), region, country
+        FROM locations
+        WHERE city IS NOT NULL AND region IS NOT NULL
+        ON CONFLICT (key) DO NOTHING
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO locations (key, country)
+        SELECT DISTINCT '||' || country, country
+        FROM locations
+        WHERE country IS NOT NULL AND (city IS NOT NULL OR region IS NOT NULL)
+        ON CONFLICT (key) DO NOTHING
+        """
+    )
+    op.execute(
+        """
+        UPDATE locations
+        SET parent_id = parent.id
+        FROM locations AS parent
+        WHERE locations.city IS NOT NULL
+          AND locations.region IS NOT NULL
+          AND parent.key = '|' || locations.region || '|' || coalesce(locations.country, '')
+        """
+    )
+    op.execute(
+        """
+        UPDATE locations
+        SET parent_id = parent.id
+        FROM locations AS parent
+        WHERE locations.country IS NOT NULL
+          AND (
+              (locations.city IS NOT NULL AND locations.region IS NULL)
+              OR (locations.city IS NULL AND locations.region IS NOT NULL)
+          )
+          AND parent.key = '||' || locations.country
+        """
+    )
+
+    for table in ROLLUPS:
+        rebuild_rollup(table, LINEAGE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Regions and countries added by the upgrade are kept, as aliases
+    # may have been resolved to them since
+    for table in ROLLUPS:
+        rebuild_rollup(table, SELF)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_constraint('locations_parent_id_fkey', 'locations', type_='foreignkey')
+    op.drop_column('locations', 'parent_id')
+    # ### end Alembic commands ###
@@ -0,0 +1,120 @@
+"""
+Rows per second inserting into cleaned_data with the multi-row INSERT
+the cleaner used before and with COPY, deduplicating urls through
+cleaned_data_urls as the cleaner does. Runs against scratch copies of
+both tables in the configured database, which are dropped afterwards.
+
+    python -m benchmarks.bulk_insert_bench
+"""
+
+import asyncio
+import time
+
+from datetime import datetime
+from sqlalchemy import MetaData, Table
+from typing import Awaitable, Callable
+
+from config import DB_ENGINE
+from db_models import CleanedData, CleanedDataUrl, Location
+from utils.bulk import bulk_insert, bulk_upsert
+from utils.db import get_db_session
+from utils.partitions import ensure_partitions
+
+SIZES: tuple[int, ...] = (1_000, 10_000, 100_000)
+
+
+def make_rows(n: int, offset: int = 0) -> list[dict]:
+    return [
+        {
+            "url": f"https://example.com/jobs/{offset + i}",
+            "title": "Software Engineer",
+            "company": "Example",
+            "industry": "Technology",
+            "salary": 60_000 + i % 40_000,
+            "currency": "GBP",
+            "location": "London",
+            "programming_languages": ["python", "sql"],
+            "responsibilities": ["Build things"],
+            "requirements": ["Python"],
+            "extras": None,
+            "created_at": datetime.now(),
+        }
+        for i in range(n)
+    ]
+
+
+async def timed(
+    urls: Table, table: Table, rows: list[dict], copy_threshold: int
+) -> float:
+    start = time.perf_counter()
+
+    async with get_db_session() as sess:
+        new_urls: list[dict] = await bulk_upsert(
+            sess,
+            urls,
+            [{"url": row["url"]} for row in rows],
+            ["url"],
+            copy_threshold=copy_threshold,
+        )
+        fresh: set[str] = {row["url"] for row in new_urls}
+        await bulk_insert(
+            sess,
+            table,
+            [row for row in rows if row["url"] in fresh],
+            copy_threshold=copy_threshold,
+        )
+
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    # The locations table is only copied so the foreign key resolves,
+    # it's never created or dropped
+    metadata = MetaData()
+    Location.__table__.to_metadata(metadata)
+    urls: Table = CleanedDataUrl.__table__.to_metadata(
+        metadata, name="cleaned_data_urls_bench"
+    )
+    table: Table = CleanedData.__table__.to_metadata(
+        metadata, name="cleaned_data_bench"
+    )
+    for index in table.indexes:
+        if str(index.name).startswith("ix_cleaned_data_"):
+            index.name = index.name.replace(
+                "ix_cleaned_data_", "ix_cleaned_data_bench_"
+            )
+
+    async with DB_ENGINE.begin() as conn:
+        await conn.run_sync(urls.create)
+        await conn.run_sync(table.create)
+    async with get_db_session() as sess:
+        await ensure_partitions(sess, table.name, ahead=0)
+
+    paths: dict[str, Callable[[list[dict]], Awaitable[float]]] = {
+        "INSERT": lambda rows: timed(urls, table, rows, copy_threshold=len(rows) + 1),
+        "COPY": lambda rows: timed(urls, table, rows, copy_threshold=0),
+    }
+
+    try:
+        offset = 0
+        for size in SIZES:
+            for name, path in paths.items():
+                rows: list[dict] = make_rows(size, offset)
+                offset += size
+
+                print(f"{name:<6} {size:>7,} rows: {await path(rows):>10,.0f} rows/sec")
+
+                # Every row conflicts on the second pass
+                print(
+                    f"{name:<6} {size:>7,} rows (duplicates): "
+                    f"{await path(rows):>10,.0f} rows/sec"
+                )
+    finally:
+        async with DB_ENGINE.begin() as conn:
+            await conn.run_sync(table.drop)
+            await conn.run_sync(urls.drop)
+        await DB_ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
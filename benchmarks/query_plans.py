@@ -0,0 +1,292 @@
+"""
+Checks the queries the dashboard runs against cleaned_data, the salary
+rollups and locations are planned the way they're meant to be. Seeds a
+scratch schema in the configured database with a million rows spread
+over the last year, explains each query and exits non-zero if any plan
+sequentially scans a table where it shouldn't, misses its index or
+reads more partitions than it should. The schema is dropped afterwards.
+
+Queries are taken from the code which runs them rather than restated,
+so a change to one is checked here.
+
+    python -m benchmarks.query_plans [--rows 1000000]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from typing import NamedTuple, Optional
+
+from config import CLEANED_DATA_PARTITIONS_AHEAD, DB_ENGINE
+from db_models import (
+    Base,
+    CleanedDataUrl,
+    IndustrySalaryStats,
+    LanguageSalaryStats,
+    Location,
+)
+from engine.chart_generator import industry_counts_query, plang_counts_query
+from engine.trends import ROLLUP_QUERIES, truncate
+from routes.root.controllers import PAGE_SIZE, salary_stats_query
+from utils.partitions import ensure_partitions
+
+SCHEMA = "query_plans"
+LOCATIONS = 5000
+INDUSTRIES = 100
+LANGUAGES = 40
+
+# Partitions from the month a trend watermark falls in onwards, which
+# may be last month, up to those created ahead, and the default
+TREND_PARTITIONS = CLEANED_DATA_PARTITIONS_AHEAD + 3
+
+
+class PlanCase(NamedTuple):
+    name: str
+    query: str
+    index: Optional[str] = None  # Index the plan must use
+    max_partitions: Optional[int] = None  # Of cleaned_data
+    full_scan: bool = False  # Reads the whole of `table` by design
+    table: str = "cleaned_data"  # Which mustn't be sequentially scanned
+
+
+def render(statement: ClauseElement) -> str:
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def trend_rollup(dimension: str, granularity: str) -> str:
+    """The roll up from TrendBuckets.roll_up at its usual watermark."""
+    since: datetime = truncate(datetime.now() - timedelta(minutes=5), granularity)
+    return (
+        ROLLUP_QUERIES[dimension]
+        .replace(":granularity", f"'{granularity}'")
+        .replace(":since", f"'{since.isoformat()}'")
+    )
+
+
+def cases() -> list[PlanCase]:
+    return [
+        *(
+            PlanCase(
+                f"{granularity}ly {dimension} trend roll up",
+                trend_rollup(dimension, granularity),
+                "ix_cleaned_data_created_at",
+                max_partitions=TREND_PARTITIONS,
+            )
+            for dimension in ROLLUP_QUERIES
+            for granularity in ("hour", "day")
+        ),
+        PlanCase(
+            "language chart counts, ChartGenerator._init and fetch_plang_chart_data",
+            render(plang_counts_query()),
+            full_scan=True,
+        ),
+        PlanCase(
+            "industry chart counts, "
+            "ChartGenerator._init and fetch_industries_chart_data",
+            render(industry_counts_query()),
+            "ix_cleaned_data_industry",
+        ),
+        *(
+            PlanCase(
+                f"{name} salaries in a location, fetch_{name}_table_data",
+                render(
+                    salary_stats_query(model, column, 7)
+                    .offset(PAGE_SIZE)
+                    .limit(PAGE_SIZE + 1)
+                ),
+                f"ix_{model.__tablename__}_location_id_count",
+                table=model.__tablename__,
+            )
+            for name, model, column in (
+                ("industries", IndustrySalaryStats, "industry"),
+                ("plang", LanguageSalaryStats, "language"),
+            )
+        ),
+        PlanCase(
+            "location of a filter, LocationResolver.location_id",
+            render(select(Location.id).where(Location.key == "City 7||")),
+            "locations_key_key",
+            table="locations",
+        ),
+        PlanCase(
+            "seen urls, SeenIndex.warm",
+            render(select(CleanedDataUrl.url)),
+            max_partitions=0,
+        ),
+    ]
+
+
+async def seed(conn: AsyncConnection, rows: int) -> None:
+    await conn.exec_driver_sql(f"SET LOCAL search_path TO {SCHEMA}")
+    await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(bind=conn) as sess:
+        await ensure_partitions(sess, since=datetime.now() - timedelta(days=366))
+
+    await conn.exec_driver_sql(
+        f"""
+        INSERT INTO locations (key, city)
+        SELECT 'City ' || i || '||', 'City ' || i
+        FROM generate_series(1, {LOCATIONS}) AS i
+        """
+    )
+    await conn.exec_driver_sql(
+        f"""
+        INSERT INTO cleaned_data (
+            url, title, company, industry, salary, currency, location,
+            location_id, programming_languages, requirements, created_at
+        )
+        SELECT 'https://example.com/jobs/' || i,
+               'Software Engineer',
+               'Company ' || i % 5000,
+               'Industry ' || (i * 31) % {INDUSTRIES},
+               CASE WHEN i % 3 = 0 THEN NULL ELSE 30000 + (i * 7919) % 90000 END,
+               'GBP',
+               'City ' || location_id,
+               location_id,
+               ARRAY['python', 'language ' || (i * 17) % {LANGUAGES}],
+               ARRAY['Python'],
+               localtimestamp - (i % (365 * 24)) * interval '1 hour'
+        FROM generate_series(1, {rows}) AS i,
+             LATERAL (SELECT 1 + (i * 13) % {LOCATIONS} AS location_id) AS l
+        """
+    )
+    await conn.exec_driver_sql(
+        "INSERT INTO cleaned_data_urls (url) SELECT url FROM cleaned_data"
+    )
+
+    # Rollups per location and across all, the sketches don't affect plans
+    for table, key, source in (
+        ("industry_salary_stats", "industry", "industry"),
+        ("language_salary_stats", "language", "unnest(programming_languages)"),
+    ):
+        await conn.exec_driver_sql(
+            f"""
+            INSERT INTO {table} ({key}, location_id, count, salary_sum, sketch)
+            SELECT name, coalesce(location_id, 0), count(*), sum(salary), '{{}}'
+            FROM (
+                SELECT {source} AS name, location_id, salary
+                FROM cleaned_data
+                WHERE salary > 0
+            ) AS salaried
+            WHERE name IS NOT NULL
+            GROUP BY GROUPING SETS ((name, location_id), (name))
+            """
+        )
+
+
+def walk(plan: dict) -> list[dict]:
+    nodes: list[dict] = [plan]
+    for child in plan.get("Plans", ()):
+        nodes.extend(walk(child))
+    return nodes
+
+
+async def check(
+    conn: AsyncConnection, case: PlanCase, parents: dict[str, str]
+) -> bool:
+    res = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {case.query}")
+    plan = res.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes: list[dict] = walk(plan[0]["Plan"])
+
+    def scans(table: str) -> set[str]:
+        return {
+            node["Relation Name"]
+            for node in nodes
+            if parents.get(node.get("Relation Name"), node.get("Relation Name"))
+            == table
+        }
+
+    scanned: set[str] = scans(case.table)
+    partitions: set[str] = scans("cleaned_data")
+    seq_scans: list[str] = [
+        node["Relation Name"]
+        for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in scanned
+    ]
+    indexes: set[str] = {
+        parents.get(node["Index Name"], node["Index Name"])
+        for node in nodes
+        if "Index Name" in node
+    }
+
+    failures: list[str] = []
+    if seq_scans and not case.full_scan:
+        failures.append(f"sequential scans of {', '.join(sorted(seq_scans))}")
+    if case.index is not None and case.index not in indexes:
+        failures.append(f"{case.index} unused, used {sorted(indexes) or 'none'}")
+    if case.max_partitions is not None and len(partitions) > case.max_partitions:
+        failures.append(f"{len(partitions)} partitions read")
+
+    print(f"{'FAIL' if failures else 'PASS'} {case.name}")
+    for failure in failures:
+        print(f"     {failure}")
+    return not failures
+
+
+async def main(rows: int) -> int:
+    async with DB_ENGINE.begin() as conn:
+        await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+
+    try:
+        print(f"Seeding {rows:,} rows")
+        async with DB_ENGINE.begin() as conn:
+            await seed(conn, rows)
+
+        async with DB_ENGINE.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql(f"VACUUM ANALYZE {SCHEMA}.cleaned_data")
+            for table in (
+                "cleaned_data_urls",
+                "locations",
+                "industry_salary_stats",
+                "language_salary_stats",
+            ):
+                await conn.exec_driver_sql(f"VACUUM ANALYZE {SCHEMA}.{table}")
+
+        async with DB_ENGINE.begin() as conn:
+            await conn.exec_driver_sql(f"SET LOCAL search_path TO {SCHEMA}")
+
+            # Partitions and their indexes, mapped to what they were created from
+            res = await conn.exec_driver_sql(
+                f"""
+                SELECT child.relname, parent.relname
+                FROM pg_inherits
+                JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_namespace ON pg_namespace.oid = child.relnamespace
+                WHERE pg_namespace.nspname = '{SCHEMA}'
+                """
+            )
+            parents: dict[str, str] = dict(res.all())
+
+            passed: list[bool] = [
+                await check(conn, case, parents) for case in cases()
+            ]
+    finally:
+        async with DB_ENGINE.begin() as conn:
+            await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await DB_ENGINE.dispose()
+
+    print(f"{sum(passed)} of {len(passed)} plans as expected")
+    return 0 if all(passed) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    sys.exit(asyncio.run(main(parser.parse_args().rows)))
@@ -0,0 +1,159 @@
+"""
+Accuracy and throughput of the salary parser over a corpus of salary
+strings as they come back from the LLM, alongside the previous
+Cleaner._parse_salary for comparison.
+
+    python -m benchmarks.salary_parser_bench
+"""
+
+import time
+
+from typing import Callable, Optional
+
+from engine.salary_parser import parse_salaries, parse_salary
+
+# (salary, expected annual figure, expected currency)
+CORPUS: list[tuple[str, Optional[float], Optional[str]]] = [
+    ("£60,000 - £70,000", 65_000, "GBP"),
+    ("£60,000 - £70,000 per annum", 65_000, "GBP"),
+    ("£60,000 - £70,000 per annum + 10% bonus", 65_000, "GBP"),
+    ("£45,000", 45_000, "GBP"),
+    ("£45k", 45_000, "GBP"),
+    ("£45k - £55k", 50_000, "GBP"),
+    ("£45-55k", 50_000, "GBP"),
+    ("45k-55k", 50_000, None),
+    ("60k", 60_000, None),
+    ("60,000 - 70,000", 65_000, None),
+    ("60 - 70", 65_000, None),
+    ("£28,000 - £32,000 a year", 30_000, "GBP"),
+    ("£30,000 to £35,000 per year", 32_500, "GBP"),
+    ("Up to £80,000 DOE", 80_000, "GBP"),
+    ("From £40,000", 40_000, "GBP"),
+    ("£90k + equity", 90_000, "GBP"),
+    ("£120,000 - £150,000 + bonus + benefits", 135_000, "GBP"),
+    ("£500 per day", 110_000, "GBP"),
+    ("£450 - £550 per day", 110_000, "GBP"),
+    ("£600/day Outside IR35", 132_000, "GBP"),
+    ("GBP 450/day", 99_000, "GBP"),
+    ("£650 p/d", 143_000, "GBP"),
+    ("£25 per hour", 48_750, "GBP"),
+    ("£25 - £30 per hour", 53_625, "GBP"),
+    ("£18.50 an hour", 36_075, "GBP"),
+    ("£40/hr", 78_000, "GBP"),
+    ("$45/hour", 87_750, "USD"),
+    ("$60 - $80 hourly", 136_500, "USD"),
+    ("£3,500 per month", 42_000, "GBP"),
+    ("£2,000 pcm", 24_000, "GBP"),
+    ("£4k/month", 48_000, "GBP"),
+    ("£1,200 pw", 62_400, "GBP"),
+    ("£900 per week", 46_800, "GBP"),
+    ("$100,000 - $120,000", 110_000, "USD"),
+    ("$150k", 150_000, "USD"),
+    ("$130,000 - $160,000 a year", 145_000, "USD"),
+    ("USD 95,000", 95_000, "USD"),
+    ("€55k - €65k", 60_000, "EUR"),
+    ("€70,000", 70_000, "EUR"),
+    ("EUR 48,000 - 52,000", 50_000, "EUR"),
+    ("£55,000–£65,000", 60_000, "GBP"),
+    ("£55,000 — £65,000", 60_000, "GBP"),
+    ("Up to 12 months contract, £500/day", 110_000, "GBP"),
+    ("£45,000 per annum (pro rata for 3 days per week)", 45_000, "GBP"),
+    ("Competitive + 401k", None, None),
+    ("1-3 years experience", None, None),
+    ("£45,000 + hybrid, 3 days a week in office", 45_000, "GBP"),
+    ("£60,000, 4 day week", 60_000, "GBP"),
+    ("£40-45k depending on experience, 1 day per week on site", 42_500, "GBP"),
+    ("Up to £90k + 10% bonus, 2 days per week in office", 90_000, "GBP"),
+    ("6 month contract at £500", None, None),
+    ("Competitive", None, None),
+    ("Competitive salary", None, None),
+    ("Not specified", None, None),
+    ("Negotiable", None, None),
+    ("DOE", None, None),
+    ("", None, None),
+]
+
+
+def legacy_parse_salary(salary: str) -> Optional[float]:
+    """Cleaner._parse_salary before the salary parser was introduced."""
+    import regex
+
+    remove_accessories = str.maketrans({"$": "", "£": "", "€": "", ",": ""})
+    salary = salary.translate(remove_accessories).strip().lower()
+
+    if matched := regex.fullmatch(r"(\d{1,3})k", salary):
+        return float(matched.group(1)) * 1000
+
+    if matched := regex.fullmatch(
+        r"(\d{1,3}(?:\d{3})?)\s*-\s*(\d{1,3}(?:\d{3})?)", salary
+    ):
+        num1, num2 = map(float, matched.groups())
+        if num1 < 10000:
+            num1 *= 1000
+        if num2 < 10000:
+            num2 *= 1000
+        return (num1 + num2) / 2
+
+    if matched := regex.fullmatch(r"\d{1,3}(?:\d{3})?", salary):
+        num = float(matched.group())
+        return num if num >= 10000 else num * 1000
+
+    return None
+
+
+def accuracy(parse: Callable[[str], Optional[float]]) -> float:
+    correct = 0
+
+    for salary, expected, _ in CORPUS:
+        annual = parse(salary)
+        if (annual is None and expected is None) or (
+            annual is not None and expected is not None and abs(annual - expected) < 1
+        ):
+            correct += 1
+
+    return correct / len(CORPUS)
+
+
+def currency_accuracy() -> float:
+    correct = sum(
+        (parsed.currency if parsed else None) == currency
+        for parsed, (_, expected, currency) in zip(
+            parse_salaries(s for s, _, _ in CORPUS), CORPUS
+        )
+        if expected is not None
+    )
+    return correct / sum(expected is not None for _, expected, _ in CORPUS)
+
+
+def throughput(parse: Callable[[list[str]], object], repeat: int = 2000) -> float:
+    # The corpus is repeated, which mirrors the real column where a handful
+    # of values such as "Competitive" dominate, but flatters the memoised parser.
+    column: list[str] = [salary for salary, _, _ in CORPUS] * repeat
+
+    start = time.perf_counter()
+    parse(column)
+    return len(column) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    def annual(salary: str) -> Optional[float]:
+        parsed = parse_salary(salary)
+        return parsed.annual if parsed else None
+
+    print(f"Corpus size: {len(CORPUS)}")
+    print(f"Legacy accuracy: {accuracy(legacy_parse_salary):.1%}")
+    print(f"Parser accuracy: {accuracy(annual):.1%}")
+    print(f"Parser currency accuracy: {currency_accuracy():.1%}")
+    print(
+        "Legacy throughput: "
+        f"{throughput(lambda c: [legacy_parse_salary(s) for s in c]):,.0f} items/sec"
+    )
+    print(
+        "Parser throughput (per item): "
+        f"{throughput(lambda c: [parse_salary(s) for s in c]):,.0f} items/sec"
+    )
+    print(f"Parser throughput (batch): {throughput(parse_salaries):,.0f} items/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,10 +31,20 @@ DB_ENGINE = create_async_engine(
 # LLM
 LLM_API_KEY = os.getenv("LLM_API_KEY")
 LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_CACHE_PREFIX = os.getenv("LLM_CACHE_PREFIX", "llm_cache")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 60 * 60 * 24 * 30))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_CONNECT_RETRIES = int(os.getenv("LLM_CONNECT_RETRIES", 2))
 
 # Playwright
 CANARY_USER_DATA_PATH = os.getenv("CANARY_USER_DATA_DIR")
 CANARY_EXE_PATH = os.getenv("CANARY_EXEC_PATH")
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "false").lower() == "true"
+BROWSER_STORAGE_STATE_PATH = os.getenv(
+    "BROWSER_STORAGE_STATE_PATH", "storage_state.json"
+)
 
 # Redis
 REDIS_HOST = os.getenv("REDIS_HOST")
@@ -57,11 +67,47 @@ REDIS_CLIENT = Redis(
 )
 
 CLEANED_DATA_KEY = os.getenv("CLEANED_DATA_KEY")
+CLEANED_DATA_STREAM = os.getenv("CLEANED_DATA_STREAM", "cleaned_data")
+SCRAPED_DATA_STREAM = os.getenv("SCRAPED_DATA_STREAM", "scraped_data")
+CLEANER_GROUP = os.getenv("CLEANER_GROUP", "cleaners")
+CLEANER_METRICS_KEY = os.getenv("CLEANER_METRICS_KEY", "cleaner_metrics")
+CLEANER_PROCESSES = int(os.getenv("CLEANER_PROCESSES", 1))
+CLEANER_TASKS = int(os.getenv("CLEANER_TASKS", 2))
+RAW_ARCHIVE_DIR: Optional[str] = os.getenv("RAW_ARCHIVE_DIR")
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 5000))
+BULK_INSERT_COPY_THRESHOLD = int(os.getenv("BULK_INSERT_COPY_THRESHOLD", 100))
+CLEANED_DATA_PARTITIONS_AHEAD = int(os.getenv("CLEANED_DATA_PARTITIONS_AHEAD", 3))
+SEEN_URLS_KEY = os.getenv("SEEN_URLS_KEY", "seen_urls")
+SEEN_URLS_RESYNC_INTERVAL = int(os.getenv("SEEN_URLS_RESYNC_INTERVAL", 60 * 60 * 24))
+INDUSTRY_CACHE_PREFIX = os.getenv("INDUSTRY_CACHE_PREFIX", "industry")
+INDUSTRY_CACHE_TTL = int(os.getenv("INDUSTRY_CACHE_TTL", 60 * 60 * 24 * 30))
 
 PLANG_BAR_CHART_KEY = os.getenv("PLANG_BAR_CHART_KEY")
 PLANG_BAR_CHART_KEY_LIVE = os.getenv("PLANG_BAR_CHART_KEY_LIVE")
-PLANG_TABLE_KEY = os.getenv("PLANG_TABLE_KEY")
 
 INDUSTRY_BAR_CHART_KEY = os.getenv("INDUSTRY_BAR_CHART_KEY")
 INDUSTRY_BAR_CHART_KEY_LIVE = os.getenv("INDUSTRY_BAR_CHART_KEY_LIVE")
-INDUSTRY_TABLE_KEY = os.getenv("INDUSTRY_TABLE_KEY")
\ No newline at end of file
+
+PLANG_COUNTS_KEY = os.getenv("PLANG_COUNTS_KEY", "plang_counts")
+INDUSTRY_COUNTS_KEY = os.getenv("INDUSTRY_COUNTS_KEY", "industry_counts")
+CHART_SNAPSHOT_INTERVAL = float(os.getenv("CHART_SNAPSHOT_INTERVAL", 60))
+CHART_GROUP = os.getenv("CHART_GROUP", "charts")
+CHART_BATCHES_KEY = os.getenv("CHART_BATCHES_KEY", "chart_batches")
+CHART_BATCH_RETENTION = int(os.getenv("CHART_BATCH_RETENTION", 60 * 60 * 24 * 7))
+OUTBOX_INTERVAL = float(os.getenv("OUTBOX_INTERVAL", 60))
+OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", 60 * 60 * 24))
+TRENDS_KEY_PREFIX = os.getenv("TRENDS_KEY_PREFIX", "trends")
+RESPONSE_CACHE_PREFIX = os.getenv("RESPONSE_CACHE_PREFIX", "response_cache")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_STALE_TTL = int(os.getenv("RESPONSE_CACHE_STALE_TTL", 60 * 60))
+RESPONSE_CACHE_VERSION_KEY = os.getenv(
+    "RESPONSE_CACHE_VERSION_KEY", "response_cache_version"
+)
+RESPONSE_CACHE_CHANNEL = os.getenv(
+    "RESPONSE_CACHE_CHANNEL", "response_cache_invalidations"
+)
+RESPONSE_CACHE_INVALIDATION_INTERVAL = float(
+    os.getenv("RESPONSE_CACHE_INVALIDATION_INTERVAL", 60)
+)
+TRENDS_CACHE_VERSION_KEY = os.getenv("TRENDS_CACHE_VERSION_KEY", "trends_cache_version")
+TRENDS_CACHE_CHANNEL = os.getenv("TRENDS_CACHE_CHANNEL", "trends_cache_invalidations")
@@ -1,5 +1,15 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped
 
 
@@ -17,24 +27,134 @@ class ScrapedData(Base):
     industry: Mapped[str] = Column(String, nullable=True)
     salary: Mapped[str] = Column(String, nullable=True)
     location: Mapped[str] = Column(String, nullable=False)
-    programming_languages: Mapped[str] = Column(String, nullable=False)
-    responsibilities: Mapped[str] = Column(String, nullable=True)
-    requirements: Mapped[str] = Column(String, nullable=False)
-    extras: Mapped[str] = Column(String, nullable=True)
+    programming_languages: Mapped[list[str]] = Column(ARRAY(String), nullable=False)
+    responsibilities: Mapped[list[str]] = Column(ARRAY(String), nullable=True)
+    requirements: Mapped[list[str]] = Column(ARRAY(String), nullable=False)
+    extras: Mapped[list[str]] = Column(ARRAY(String), nullable=True)
+
+
+class Location(Base):
+    __tablename__ = "locations"
+
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    key: Mapped[str] = Column(String, nullable=False, unique=True)  # city|region|country
+    city: Mapped[str] = Column(String, nullable=True)
+    region: Mapped[str] = Column(String, nullable=True)
+    country: Mapped[str] = Column(String, nullable=True)
+    # The region or country a city is in, or the country a region is in
+    parent_id: Mapped[int] = Column(Integer, ForeignKey("locations.id"), nullable=True)
+
+
+class LocationAlias(Base):
+    __tablename__ = "location_aliases"
+
+    raw: Mapped[str] = Column(String, primary_key=True)
+    location_id: Mapped[int] = Column(
+        Integer, ForeignKey("locations.id"), nullable=True, index=True
+    )
+    work_mode: Mapped[str] = Column(String(8), nullable=True)
+
+
+class CleanedDataUrl(Base):
+    """Every url in cleaned_data, which can't hold a unique index across partitions."""
+
+    __tablename__ = "cleaned_data_urls"
+
+    url: Mapped[str] = Column(String, primary_key=True)
 
 
 class CleanedData(Base):
     __tablename__ = "cleaned_data"
+    __table_args__ = (
+        Index(
+            "ix_cleaned_data_programming_languages",
+            "programming_languages",
+            postgresql_using="gin",
+        ),
+        # Covers the industry chart counts, salary stats are read from the
+        # rollups, see benchmarks/query_plans.py
+        Index("ix_cleaned_data_industry", "industry"),
+        # Monthly partitions are created by utils.partitions.ensure_partitions
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
-    url: Mapped[str] = Column(String, nullable=False, unique=True)
+    url: Mapped[str] = Column(String, nullable=False)
     title: Mapped[str] = Column(String, nullable=False)
     company: Mapped[str] = Column(String, nullable=False)
     industry: Mapped[str] = Column(String, nullable=True)
     salary: Mapped[float] = Column(Integer, nullable=True)
+    currency: Mapped[str] = Column(String(3), nullable=True)
     location: Mapped[str] = Column(String, nullable=False)
-    programming_languages: Mapped[str] = Column(String, nullable=False)
-    responsibilities: Mapped[str] = Column(String, nullable=True)
-    requirements: Mapped[str] = Column(String, nullable=False)
-    extras: Mapped[str] = Column(String, nullable=True)
-    created_at: Mapped[datetime] = Column(DateTime, default=datetime.now, nullable=True)
+    location_id: Mapped[int] = Column(
+        Integer, ForeignKey("locations.id"), nullable=True, index=True
+    )
+    work_mode: Mapped[str] = Column(String(8), nullable=True)
+    programming_languages: Mapped[list[str]] = Column(ARRAY(String), nullable=False)
+    responsibilities: Mapped[list[str]] = Column(ARRAY(String), nullable=True)
+    requirements: Mapped[list[str]] = Column(ARRAY(String), nullable=False)
+    extras: Mapped[list[str]] = Column(ARRAY(String), nullable=True)
+    created_at: Mapped[datetime] = Column(
+        DateTime, default=datetime.now, primary_key=True, index=True
+    )
+
+
+class CleanedDataOutbox(Base):
+    """
+    Batches inserted into cleaned_data, written in the same transaction
+    as the rows and published to the cleaned data log after commit.
+    Published batches keep their ID, without the rows, for a while so
+    the chart generator can tell which batches a scan already counted.
+    """
+
+    __tablename__ = "cleaned_data_outbox"
+    __table_args__ = (
+        Index(
+            "ix_cleaned_data_outbox_unpublished",
+            "created_at",
+            postgresql_where=text("published_at IS NULL"),
+        ),
+    )
+
+    batch_id: Mapped[str] = Column(String, primary_key=True)
+    data: Mapped[list[dict]] = Column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = Column(
+        DateTime, default=datetime.now, nullable=False
+    )
+    published_at: Mapped[datetime] = Column(DateTime, nullable=True, index=True)
+
+
+class TrendBucket(Base):
+    __tablename__ = "trend_buckets"
+
+    dimension: Mapped[str] = Column(String(16), primary_key=True)
+    granularity: Mapped[str] = Column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = Column(DateTime, primary_key=True)
+    name: Mapped[str] = Column(String, primary_key=True)
+    count: Mapped[int] = Column(Integer, nullable=False)
+
+
+class IndustrySalaryStats(Base):
+    __tablename__ = "industry_salary_stats"
+    __table_args__ = (
+        Index("ix_industry_salary_stats_location_id_count", "location_id", "count"),
+    )
+
+    industry: Mapped[str] = Column(String, primary_key=True)
+    location_id: Mapped[int] = Column(Integer, primary_key=True)  # 0 for all locations
+    count: Mapped[int] = Column(Integer, nullable=False)
+    salary_sum: Mapped[int] = Column(BigInteger, nullable=False)
+    sketch: Mapped[dict] = Column(JSONB, nullable=False)
+
+
+class LanguageSalaryStats(Base):
+    __tablename__ = "language_salary_stats"
+    __table_args__ = (
+        Index("ix_language_salary_stats_location_id_count", "location_id", "count"),
+    )
+
+    language: Mapped[str] = Column(String, primary_key=True)
+    location_id: Mapped[int] = Column(Integer, primary_key=True)  # 0 for all locations
+    count: Mapped[int] = Column(Integer, nullable=False)
+    salary_sum: Mapped[int] = Column(BigInteger, nullable=False)
+    sketch: Mapped[dict] = Column(JSONB, nullable=False)
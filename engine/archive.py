@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+
+from datetime import datetime
+from typing import IO, Optional
+
+
+class RawArchive:
+    """
+    Append-only archive of raw scraped rows as gzipped JSON Lines. Rows
+    are written a batch at a time as they flow through, nothing is held
+    in memory. A new file is started once the current one has had
+    `max_bytes` of JSON written to it or has been open for `max_age`
+    seconds.
+
+    Attributes:
+        directory (str): The directory archive files are written to.
+        prefix (str): Prefix of the file names, distinguishes writers.
+        max_bytes (int): The uncompressed size at which files are rotated.
+        max_age (float): The time in seconds after which files are rotated.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        prefix: str = "raw",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 60 * 60,
+    ) -> None:
+        self._directory = directory
+        self._prefix = prefix
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._file: Optional[IO[bytes]] = None
+        self._written = 0
+        self._opened_at = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+
+    async def write(self, rows: list[dict]) -> None:
+        if rows:
+            await asyncio.to_thread(self._write, rows)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def _write(self, rows: list[dict]) -> None:
+        if self._file is None or self._should_rotate():
+            self._rotate()
+
+        # Encoded here so the rotation size is counted in bytes
+        data: bytes = "".join(json.dumps(row) + "\n" for row in rows).encode()
+        self._file.write(data)
+        self._file.flush()
+        self._written += len(data)
+
+    def _should_rotate(self) -> bool:
+        return (
+            self._written >= self._max_bytes
+            or time.monotonic() - self._opened_at >= self._max_age
+        )
+
+    def _rotate(self) -> None:
+        self._close()
+
+        name = f"{self._prefix}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self._directory, name), "wb")
+        self._written = 0
+        self._opened_at = time.monotonic()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+
+from contextlib import asynccontextmanager
+from playwright.async_api import (
+    async_playwright,
+    Browser,
+    BrowserContext,
+    Error as PlaywrightError,
+    Playwright,
+    Route,
+)
+from typing import AsyncGenerator, Iterable, Optional
+from urllib.parse import urlparse
+
+from config import (
+    BROWSER_HEADLESS,
+    BROWSER_STORAGE_STATE_PATH,
+    CANARY_EXE_PATH,
+    CANARY_USER_DATA_PATH,
+)
+
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "scorecardresearch.com",
+    "px.ads.linkedin.com",
+    "snap.licdn.com",
+)
+
+
+def is_blocked(url: str, resource_type: str, allow: Iterable[str] = ()) -> bool:
+    """
+    Whether a request should be aborted. Requests whose URL contains
+    any of the `allow` patterns are always let through.
+    """
+    if any(pattern in url for pattern in allow):
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+
+    host: str = urlparse(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+class BrowserPool:
+    """
+    Single browser process handing out isolated contexts. Contexts
+    are returned to the pool once released and handed out again to
+    scrapers with the same allow-list, saving the cost of creating
+    one per run. Every context aborts images, media, fonts and
+    analytics requests unless allowed.
+
+    Attributes:
+        headless (bool): Whether to launch the browser without a window.
+        max_contexts (int): The maximum number of contexts open at once.
+        storage_state_path (str | None): Cookies and local storage loaded into each
+            new context, and saved back when the pool closes. Exported from the
+            Canary profile on start when missing.
+    """
+
+    def __init__(
+        self,
+        *,
+        headless: bool = BROWSER_HEADLESS,
+        max_contexts: int = 4,
+        storage_state_path: Optional[str] = BROWSER_STORAGE_STATE_PATH,
+    ) -> None:
+        self._headless = headless
+        self._storage_state_path = storage_state_path
+        self._slots = asyncio.Semaphore(max_contexts)
+        self._idle: dict[tuple[str, ...], list[BrowserContext]] = {}
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self._headless, executable_path=CANARY_EXE_PATH
+        )
+
+        path: Optional[str] = self._storage_state_path
+        if not path or os.path.exists(path):
+            return
+
+        if CANARY_USER_DATA_PATH:
+            try:
+                await _export_storage_state(self._playwright, path)
+                return
+            except PlaywrightError as e:
+                logger.warning(f"Failed to export storage state to {path}: {e}")
+
+        logger.warning(
+            f"No storage state at {path}, contexts will start logged out"
+        )
+
+    async def close(self) -> None:
+        contexts: list[BrowserContext] = [
+            ctx for idle in self._idle.values() for ctx in idle
+        ]
+        self._idle.clear()
+
+        if contexts and self._storage_state_path:
+            await contexts[0].storage_state(path=self._storage_state_path)
+
+        for ctx in contexts:
+            await ctx.close()
+
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    @asynccontextmanager
+    async def context(
+        self, allow: Iterable[str] = ()
+    ) -> AsyncGenerator[BrowserContext, None]:
+        allow = tuple(allow)
+
+        async with self._slots:
+            ctx: BrowserContext = await self._acquire(allow)
+
+            try:
+                yield ctx
+            finally:
+                for page in ctx.pages:
+                    await page.close()
+                self._idle.setdefault(allow, []).append(ctx)
+
+    async def _acquire(self, allow: tuple[str, ...]) -> BrowserContext:
+        if idle := self._idle.get(allow):
+            return idle.pop()
+
+        storage_state: Optional[str] = None
+        if self._storage_state_path and os.path.exists(self._storage_state_path):
+            storage_state = self._storage_state_path
+
+        ctx: BrowserContext = await self._browser.new_context(
+            storage_state=storage_state
+        )
+
+        async def handle(route: Route) -> None:
+            request = route.request
+            if is_blocked(request.url, request.resource_type, allow):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await ctx.route("**/*", handle)
+        return ctx
+
+
+async def export_storage_state(path: str = BROWSER_STORAGE_STATE_PATH) -> None:
+    """
+    Saves the cookies and local storage of the persistent Canary profile
+    to `path` so pooled contexts start logged in.
+    """
+    async with async_playwright() as p:
+        await _export_storage_state(p, path)
+
+
+async def _export_storage_state(playwright: Playwright, path: str) -> None:
+    ctx: BrowserContext = await playwright.chromium.launch_persistent_context(
+        user_data_dir=CANARY_USER_DATA_PATH,
+        headless=True,
+        executable_path=CANARY_EXE_PATH,
+    )
+    try:
+        await ctx.storage_state(path=path)
+    finally:
+        await ctx.close()
+
+    logger.info(f"Exported storage state to {path}")
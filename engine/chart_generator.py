@@ -1,62 +1,184 @@
 import asyncio
 import json
+import logging
+import time
+
+from datetime import datetime
+from redis.exceptions import WatchError
+from sqlalchemy import Select, func, select, true
 from typing import Dict, List, Optional
+
 from config import (
+    CHART_BATCH_RETENTION,
+    CHART_BATCHES_KEY,
+    CHART_SNAPSHOT_INTERVAL,
     INDUSTRY_BAR_CHART_KEY,
     INDUSTRY_BAR_CHART_KEY_LIVE,
+    INDUSTRY_COUNTS_KEY,
     PLANG_BAR_CHART_KEY,
     PLANG_BAR_CHART_KEY_LIVE,
-    CLEANED_DATA_KEY,
+    PLANG_COUNTS_KEY,
     REDIS_CLIENT,
+    TRENDS_CACHE_CHANNEL,
+    TRENDS_CACHE_VERSION_KEY,
 )
+from db_models import CleanedData, CleanedDataOutbox
+from utils.db import get_db_session
+from .response_cache import ResponseInvalidator
+from .transport import Batch, CleanedDataLog, entry_timestamp
+from .trends import TrendBuckets
+from .utils import decode_counts, merge_aliases
+
+
+logger = logging.getLogger(__name__)
+
+
+def plang_counts_query() -> Select:
+    """Counts the postings using each language across cleaned_data."""
+    lang = (
+        func.unnest(CleanedData.programming_languages)
+        .table_valued("value")
+        .render_derived()
+    )
+    return (
+        select(func.lower(lang.c.value), func.count())
+        .select_from(CleanedData)
+        .join(lang, true())
+        .group_by(func.lower(lang.c.value))
+    )
+
+
+def industry_counts_query() -> Select:
+    """
+    Counts the postings in each industry across cleaned_data. Grouped
+    on the bare column so it's read from ix_cleaned_data_industry, rows
+    without an industry come back under None.
+    """
+    return select(CleanedData.industry, func.count()).group_by(CleanedData.industry)
+
+
+def industry_counts(rows: list[tuple[Optional[str], int]]) -> Dict[str, int]:
+    # Matches the key json.dumps gave missing industries previously
+    return {(ind if ind is not None else "null"): count for ind, count in rows}
 
 
 class ChartGenerator:
-    def __init__(self) -> None:
-        self._curr_plang_bar_chart_data: Dict[str, int] = {}
-        self._curr_industry_bar_chart_data: Dict[str, int] = {}
+    """
+    Maintains the programming language and industry bar charts as
+    Redis hashes of counts. Batches of newly inserted rows are read
+    from the cleaned data log, each is applied with a single MULTI of
+    HINCRBYs, so the cost is proportional to the number of bars which
+    changed, and only those bars are published on the live channels.
+    The hashes are the only state, a restart carries on from them
+    rather than reloading a copy.
+
+    The IDs of applied batches are recorded in the same MULTI as the
+    increments, which only commits if no batch was recorded since the
+    batch was checked. A batch which is replayed, because the generator
+    died before acknowledging it or the cleaner published it twice, or
+    which two generators reclaimed at once, is recognised and skipped,
+    so counts stay exact without a recount.
+    Batch IDs are kept for `batch_retention` seconds.
+
+    Every `snapshot_interval` seconds the hashes are compacted, bars
+    which dropped to zero are removed, and the full chart is written
+    to its snapshot key and published so clients can resync. The
+    hourly and daily trend buckets are rolled up at the same time.
+
+    Live messages take the form {"type": "delta" | "snapshot", "data": {bar: count}},
+    where counts are totals rather than increments.
+
+    Attributes:
+        log (CleanedDataLog | None): The log of inserted rows to consume.
+        snapshot_interval (float): The time in seconds between snapshots.
+        batch_retention (int): The time in seconds applied batch IDs are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        log: Optional[CleanedDataLog] = None,
+        snapshot_interval: float = CHART_SNAPSHOT_INTERVAL,
+        batch_retention: int = CHART_BATCH_RETENTION,
+    ) -> None:
+        self._log = log or CleanedDataLog()
+        self._snapshot_interval = snapshot_interval
+        self._batch_retention = batch_retention
+        self._trends = TrendBuckets()
+        # Trends have their own version, bumped once batches are applied
+        self._trends_invalidator = ResponseInvalidator(
+            version_key=TRENDS_CACHE_VERSION_KEY, channel=TRENDS_CACHE_CHANNEL
+        )
 
     async def run(self) -> None:
         await self._init()
-        await self._listen()
+        snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+        try:
+            await self._listen()
+        finally:
+            snapshot_task.cancel()
 
     async def _init(self) -> None:
-        prev: Optional[bytes] = await REDIS_CLIENT.get(PLANG_BAR_CHART_KEY)
-        if prev is not None:
-            self._curr_plang_bar_chart_data = json.loads(prev)
+        """
+        Builds the counts from cleaned_data if the hashes don't exist yet.
 
-        prev: Optional[bytes] = await REDIS_CLIENT.get(INDUSTRY_BAR_CHART_KEY)
-        if prev is not None:
-            self._curr_industry_bar_chart_data = json.loads(prev)
+        The log position is taken before the scan, and the scan reads a
+        single snapshot alongside the IDs of every batch in the outbox
+        it covers. Reading resumes from that position, and batches
+        logged after it whose rows the scan already counted are marked
+        as applied, so each row is counted exactly once.
+        """
+        if await REDIS_CLIENT.exists(PLANG_COUNTS_KEY, INDUSTRY_COUNTS_KEY):
+            return
 
-    async def _listen(self) -> None:
-        async with REDIS_CLIENT.pubsub() as ps:
-            await ps.subscribe(CLEANED_DATA_KEY)
+        position: str = await self._log.last_id()
+
+        logger.info("Building chart counts from cleaned_data")
 
-            async for message in ps.listen():
-                if message["type"] == "message":
-                    loaded_data: List[dict] = json.loads(message["data"])
-                    await asyncio.gather(
-                        self._gen_industry_bar_chart(loaded_data),
-                        self._gen_plang_bar_chart(loaded_data),
-                    )
+        async with get_db_session() as sess:
+            await sess.connection(
+                execution_options={"isolation_level": "REPEATABLE READ"}
+            )
+            res = await sess.execute(plang_counts_query())
+            plang_counts: Dict[str, int] = merge_aliases(dict(res.all()))
 
-    async def _gen_plang_bar_chart(self, data: List[dict]) -> None:
-        counts: dict = self._get_plang_counts(data)
+            res = await sess.execute(industry_counts_query())
+            industry_chart: Dict[str, int] = industry_counts(res.all())
 
-        for key in counts:
-            self._curr_plang_bar_chart_data.setdefault(key, 0)
-            self._curr_plang_bar_chart_data[key] += counts[key]
+            res = await sess.execute(select(CleanedDataOutbox.batch_id))
+            counted: List[str] = list(res.scalars())
 
-        dumped: str = json.dumps(self._curr_plang_bar_chart_data)
-        await REDIS_CLIENT.set(PLANG_BAR_CHART_KEY, dumped)
-        await REDIS_CLIENT.publish(PLANG_BAR_CHART_KEY_LIVE, dumped)
+        await self._log.skip_to(position)
+
+        async with REDIS_CLIENT.pipeline(transaction=True) as pipe:
+            if counted:
+                pipe.zadd(CHART_BATCHES_KEY, dict.fromkeys(counted, time.time()))
+            if plang_counts:
+                pipe.hset(PLANG_COUNTS_KEY, mapping=plang_counts)
+            if industry_chart:
+                pipe.hset(INDUSTRY_COUNTS_KEY, mapping=industry_chart)
+            await pipe.execute()
+
+        await self._snapshot()
+
+    async def _listen(self) -> None:
+        while True:
+            batches: List[Batch] = await self._log.read()
+
+            for entry_id, batch_id, data in batches:
+                if not await self._apply(
+                    batch_id, data, datetime.fromtimestamp(entry_timestamp(entry_id))
+                ):
+                    logger.info(f"Skipping batch {batch_id}, already applied")
+
+                await self._log.ack([entry_id])
+
+            await self._trends_invalidator.flush()
 
     def _get_plang_counts(self, data: List[dict]) -> dict:
         programming_languages: List[str] = [
-            lang.lower()
-            for d in data
-            for lang in json.loads(d["programming_languages"])
+            lang.lower() for d in data for lang in d["programming_languages"]
         ]
 
         counts: dict[str, int] = {}
@@ -65,20 +187,98 @@ class ChartGenerator:
             counts.setdefault(lang, 0)
             counts[lang] += 1
 
-        if "typescript" in counts:
-            counts["typescript"] += counts.get("javascript", 0)
-        if "go" in counts:
-            counts["go"] += counts.get("golang", 0)
+        return merge_aliases(counts)
+
+    def _get_industry_counts(self, data: List[dict]) -> dict:
+        counts: dict[str, int] = {}
+
+        for d in data:
+            # Matches the key json.dumps gave missing industries previously
+            ind: str = d["industry"] if d["industry"] is not None else "null"
+            counts.setdefault(ind, 0)
+            counts[ind] += 1
 
         return counts
 
-    async def _gen_industry_bar_chart(self, data: List[dict]) -> None:
-        industries: List[str] = [d["industry"] for d in data]
+    async def _apply(self, batch_id: str, data: List[dict], at: datetime) -> bool:
+        """
+        Increments the changed bars and the trend buckets the rows were
+        created in and records the batch as applied atomically, then
+        publishes the new totals of the changed bars. Returns False,
+        having changed nothing, if the batch was already applied.
+        """
+        charts: tuple[tuple[str, str, Dict[str, int]], ...] = (
+            (PLANG_COUNTS_KEY, PLANG_BAR_CHART_KEY_LIVE, self._get_plang_counts(data)),
+            (
+                INDUSTRY_COUNTS_KEY,
+                INDUSTRY_BAR_CHART_KEY_LIVE,
+                self._get_industry_counts(data),
+            ),
+        )
+
+        async with REDIS_CLIENT.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Any batch recorded after the check aborts the MULTI,
+                    # so a batch is never applied twice concurrently
+                    await pipe.watch(CHART_BATCHES_KEY)
+                    if await pipe.zscore(CHART_BATCHES_KEY, batch_id) is not None:
+                        return False
+
+                    pipe.multi()
+                    for key, _, counts in charts:
+                        for field, value in counts.items():
+                            pipe.hincrby(key, field, value)
+                    pipe.zadd(CHART_BATCHES_KEY, {batch_id: time.time()})
+                    self._trends.increment(pipe, data, at)
+                    totals: List[int] = await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        for _, channel, counts in charts:
+            if counts:
+                await REDIS_CLIENT.publish(
+                    channel,
+                    json.dumps({"type": "delta", "data": dict(zip(counts, totals))}),
+                )
+            totals = totals[len(counts) :]
+
+        self._trends_invalidator.mark()
+        return True
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            try:
+                await self._trends.roll_up()
+                self._trends_invalidator.mark()
+            except Exception as e:
+                logger.error(f"Trend roll up failed: {type(e)} - {str(e)}")
+
+            await asyncio.sleep(self._snapshot_interval)
+            try:
+                await self._snapshot()
+            except Exception as e:
+                logger.error(f"Chart snapshot failed: {type(e)} - {str(e)}")
+
+    async def _snapshot(self) -> None:
+        await REDIS_CLIENT.zremrangebyscore(
+            CHART_BATCHES_KEY, "-inf", time.time() - self._batch_retention
+        )
+
+        for key, snapshot_key, channel in (
+            (PLANG_COUNTS_KEY, PLANG_BAR_CHART_KEY, PLANG_BAR_CHART_KEY_LIVE),
+            (INDUSTRY_COUNTS_KEY, INDUSTRY_BAR_CHART_KEY, INDUSTRY_BAR_CHART_KEY_LIVE),
+        ):
+            counts: Dict[str, int] = decode_counts(await REDIS_CLIENT.hgetall(key))
 
-        for ind in industries:
-            self._curr_industry_bar_chart_data.setdefault(ind, 0)
-            self._curr_industry_bar_chart_data[ind] += 1
+            stale: List[str] = [field for field, value in counts.items() if value <= 0]
+            if stale:
+                await REDIS_CLIENT.hdel(key, *stale)
+                for field in stale:
+                    counts.pop(field)
 
-        dumped: str = json.dumps(self._curr_industry_bar_chart_data)
-        await REDIS_CLIENT.set(INDUSTRY_BAR_CHART_KEY, dumped)
-        await REDIS_CLIENT.publish(INDUSTRY_BAR_CHART_KEY_LIVE, dumped)
+            await REDIS_CLIENT.set(snapshot_key, json.dumps(counts))
+            await REDIS_CLIENT.publish(
+                channel, json.dumps({"type": "snapshot", "data": counts})
+            )
@@ -1,107 +1,363 @@
-import asyncio
+import hashlib
 import json
 import logging
-import multiprocessing
-import regex
+import time
 
-from queue import Empty
+from datetime import datetime, timedelta
 from typing import List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import delete, select, update
 from sqlalchemy.dialects.postgresql import insert
 
-from config import CLEANED_DATA_KEY, REDIS_CLIENT
-from db_models import CleanedData
+from config import CLEANER_METRICS_KEY, OUTBOX_INTERVAL, OUTBOX_RETENTION, REDIS_CLIENT
+from db_models import CleanedData, CleanedDataOutbox, CleanedDataUrl
+from utils.bulk import bulk_insert, bulk_upsert
 from utils.db import get_db_session
-from .models import LLMExtractedObject
+from utils.partitions import ensure_partitions, month_start
+from .archive import RawArchive
+from .locations import LocationResolver
+from .response_cache import ResponseInvalidator
+from .salary_parser import ParsedSalary, parse_salaries
+from .salary_rollup import SalaryRollup
+from .transport import BaseTransport, CleanedDataLog, Entry, entry_timestamp
 
 
 logger = logging.getLogger(__name__)
 
+LIST_FIELDS: tuple[str, ...] = (
+    "programming_languages",
+    "responsibilities",
+    "requirements",
+    "extras",
+)
+
+
+class CleanerMetrics:
+    """
+    Throughput and lag of a single cleaner. Lag is the age of the
+    oldest entry in a batch at the point it was flushed.
+    """
+
+    def __init__(self) -> None:
+        self._started_at = time.monotonic()
+        self.rows = 0
+        self.batches = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    def record(self, rows: int, published_at: float) -> None:
+        self.rows += rows
+        self.batches += 1
+        self.lag = max(0.0, time.time() - published_at)
+        self.max_lag = max(self.max_lag, self.lag)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started_at
+        return self.rows / elapsed if elapsed else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "rows_per_second": round(self.rows_per_second, 2),
+            "lag": round(self.lag, 3),
+            "max_lag": round(self.max_lag, 3),
+        }
+
 
 class Cleaner:
     """
     Cleans the extracted data and inserts it into the database.
 
+    Any number of cleaners can read from the same transport. Each one
+    buffers entries into a micro-batch until it holds `max_rows` rows
+    or `linger` seconds have passed since the first arrived, then
+    flushes the batch with a single insert and publish. Entries are
+    only acknowledged once persisted, so anything in flight when a
+    cleaner dies is redelivered to another.
+
+    Inserted rows are written to cleaned_data_outbox in the same
+    transaction and published to the cleaned data log after commit.
+    Batches left unpublished by a cleaner which died in between are
+    published by whichever cleaner next drains the outbox.
+
     Attributes:
-        queue (multiprocessing.Queue): The queue to get the data from.
-        sleep (int): The time to sleep between checking the queue if it's empty.
+        source (BaseTransport): The transport to read scraped data from.
+        name (str): Identifies the cleaner in its metrics.
+        max_rows (int): The number of rows which triggers a flush.
+        linger (float): The maximum time in seconds to wait for a batch to fill.
+        count (int): The maximum number of entries read at once.
+        block (int): The time in milliseconds to wait for entries.
+        default_currency (str | None): Currency of salaries which don't state one.
+        archive (RawArchive | None): Where raw rows are archived, not archived if None.
+        log (CleanedDataLog | None): Where inserted rows are published for the chart generator.
+        locations (LocationResolver | None): Resolves raw locations to the locations table.
+        outbox_interval (float): The time in seconds between drains of the outbox.
     """
 
-    def __init__(self, queue: multiprocessing.Queue, *, sleep: int = 1) -> None:
-        self._queue = queue
-        self.sleep = sleep
+    def __init__(
+        self,
+        source: BaseTransport,
+        *,
+        name: str = "cleaner",
+        max_rows: int = 500,
+        linger: float = 2.0,
+        count: int = 10,
+        block: int = 1000,
+        default_currency: Optional[str] = "GBP",
+        archive: Optional[RawArchive] = None,
+        log: Optional[CleanedDataLog] = None,
+        locations: Optional[LocationResolver] = None,
+        outbox_interval: float = OUTBOX_INTERVAL,
+    ) -> None:
+        self._source = source
+        self._name = name
+        self._max_rows = max_rows
+        self._linger = linger
+        self._count = count
+        self._block = block
+        self._default_currency = default_currency
+        self._archive = archive
+        self._log = log or CleanedDataLog()
+        self._locations = locations or LocationResolver()
+        self._metrics = CleanerMetrics()
+        self._partitioned_month: Optional[datetime] = None
+        self._outbox_interval = outbox_interval
+        self._outbox_drained_at = 0.0
+        self._invalidator = ResponseInvalidator()
 
     async def run(self) -> None:
-        cleaned_data = []
-        dump_data: list[dict] = [] # temporary
-
         try:
             while True:
-                try:
-                    extracted_data: List[LLMExtractedObject] = self._queue.get(
-                        block=True
-                    )
-                    logger.info(f"Cleaning {len(extracted_data)} items")
-
-                    for data in extracted_data:
-                        dump_data.append(data.model_dump())
-                        cleaned_data.append(self.clean(data))
-
-                    logger.info("Finished cleaning batch")
-                    if cleaned_data:
-                        await self._persist(cleaned_data)
-                        await self._transport(cleaned_data)
-                        cleaned_data.clear()
-                except Empty:
-                    await asyncio.sleep(self.sleep)
+                if time.monotonic() - self._outbox_drained_at >= self._outbox_interval:
+                    await self._drain_outbox()
+                # Reached at least once a read, so changes held back by the
+                # rate limit are invalidated soon after it allows
+                await self._invalidator.flush()
+
+                entries: List[Entry] = await self._read_batch()
+                if not entries:
+                    continue
+
+                extracted_data: list[dict] = [
+                    data for _, batch in entries for data in batch
+                ]
+                if self._archive is not None:
+                    await self._archive.write(extracted_data)
+
+                cleaned_data: list[dict] = self.clean(extracted_data)
+
+                logger.info(f"[{self._name}] Cleaned {len(cleaned_data)} items")
+                if cleaned_data:
+                    batch_id: str = self._batch_id(entries)
+                    inserted: list[dict] = await self._persist(cleaned_data, batch_id)
+                    await self._transport(inserted, batch_id)
+                    if inserted:
+                        self._invalidator.mark()
+
+                await self._source.ack([entry_id for entry_id, _ in entries])
+                self._metrics.record(
+                    len(cleaned_data),
+                    min(entry_timestamp(entry_id) for entry_id, _ in entries),
+                )
+                await self._report()
         finally:
             print("Cleaning finished")
-            with open("data.json", "w") as f:
-                json.dump(dump_data, f, indent=4)
-
-    def clean(self, data: LLMExtractedObject) -> dict:
-        dumped = data.model_dump()
-        dumped["salary"] = self._parse_salary(dumped["salary"])
-        return dumped
-
-    def _parse_salary(self, salary: str) -> Optional[float]:
-        remove_accessories = str.maketrans({"$": "", "£": "", "€": "", ",": ""})
-        salary = salary.translate(remove_accessories).strip().lower()
-
-        # Match "60k", "70k" (Ensure 5 digits at conversion)
-        if matched := regex.fullmatch(r"(\d{1,3})k", salary):
-            return float(matched.group(1)) * 1000
-
-        # Match "60,000 - 70,000"(Ensure each is at least 5 digits)
-        if matched := regex.fullmatch(
-            r"(\d{1,3}(?:\d{3})?)\s*-\s*(\d{1,3}(?:\d{3})?)", salary
-        ):
-            num1, num2 = map(float, matched.groups())
-            if num1 < 10000:
-                num1 *= 1000
-            if num2 < 10000:
-                num2 *= 1000
-            return (num1 + num2) / 2
-
-        # Match "60,000" or similar (Ensure at least 5 digits)
-        if matched := regex.fullmatch(r"\d{1,3}(?:\d{3})?", salary):
-            num = float(matched.group())
-            return num if num >= 10000 else num * 1000
-
-        return None
-
-    async def _persist(self, data: List[dict]) -> None:
+            if self._archive is not None:
+                await self._archive.close()
+
+    async def _read_batch(self) -> List[Entry]:
+        entries: List[Entry] = await self._source.read(
+            count=self._count, block=self._block
+        )
+        if not entries:
+            return entries
+
+        rows: int = sum(len(data) for _, data in entries)
+        deadline: float = time.monotonic() + self._linger
+
+        while rows < self._max_rows:
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            more: List[Entry] = await self._source.read(
+                count=self._count, block=max(1, int(remaining * 1000))
+            )
+            entries.extend(more)
+            rows += sum(len(data) for _, data in more)
+
+        return entries
+
+    async def _report(self) -> None:
+        metrics: dict[str, float] = self._metrics.to_dict()
+        logger.info(f"[{self._name}] {metrics}")
+
+        try:
+            await REDIS_CLIENT.hset(
+                f"{CLEANER_METRICS_KEY}:{self._name}", mapping=metrics
+            )
+        except RedisError as e:
+            logger.warning(f"Failed to report metrics: {e}")
+
+    def clean(self, data: list[dict]) -> list[dict]:
+        salaries: list[Optional[ParsedSalary]] = parse_salaries(
+            (d["salary"] for d in data), default_currency=self._default_currency
+        )
+
+        cleaned_data: list[dict] = []
+        for d, salary in zip(data, salaries):
+            cleaned = dict(d)
+            cleaned["salary"] = round(salary.annual) if salary is not None else None
+            cleaned["currency"] = salary.currency if salary is not None else None
+
+            for field in LIST_FIELDS:
+                # Rows published before the array migration carry JSON strings
+                if isinstance(cleaned.get(field), str):
+                    cleaned[field] = json.loads(cleaned[field])
+
+            cleaned_data.append(cleaned)
+
+        return cleaned_data
+
+    async def _persist(self, data: List[dict], batch_id: str) -> List[dict]:
+        """
+        Inserts the cleaned rows and records them in the outbox under
+        `batch_id`, returning those which weren't duplicates.
+        """
         logger.info("Inserting cleaned data into the database")
-        
+
+        # Kept in its own transaction as creating a partition locks cleaned_data
+        if self._partitioned_month != (month := month_start(datetime.now())):
+            async with get_db_session() as sess:
+                await ensure_partitions(sess)
+            self._partitioned_month = month
+
         async with get_db_session() as sess:
-            await sess.execute(
-                insert(CleanedData)
-                .values(data)
-                .on_conflict_do_nothing("cleaned_data_url_key")
+            resolved = await self._locations.resolve(
+                sess, (d["location"] for d in data)
+            )
+            for d in data:
+                d["location_id"] = resolved[d["location"]].location_id
+                d["work_mode"] = resolved[d["location"]].work_mode
+
+            # Urls are deduplicated through cleaned_data_urls as a unique
+            # index on the partitioned table would have to include created_at
+            new_urls: list[dict] = await bulk_upsert(
+                sess,
+                CleanedDataUrl.__table__,
+                [{"url": d["url"]} for d in data],
+                ["url"],
+            )
+            urls: set[str] = {row["url"] for row in new_urls}
+            inserted: list[dict] = list(
+                {d["url"]: d for d in data if d["url"] in urls}.values()
             )
+            created_at: datetime = datetime.now()
+            for d in inserted:
+                d["created_at"] = created_at
+            await bulk_insert(sess, CleanedData.__table__, inserted)
+
+            # Applied in the same transaction so the stats only ever
+            # reflect committed rows
+            await SalaryRollup().add(
+                inserted,
+                {
+                    r.location_id: r.ancestors
+                    for r in resolved.values()
+                    if r.location_id is not None
+                },
+            ).apply(sess)
+
+            # Published with their creation time so the trend buckets
+            # they're counted into match the roll up's
+            inserted = [{**d, "created_at": created_at.isoformat()} for d in inserted]
+            if inserted:
+                await sess.execute(
+                    insert(CleanedDataOutbox)
+                    .values(batch_id=batch_id, data=inserted)
+                    .on_conflict_do_nothing(index_elements=["batch_id"])
+                )
             await sess.commit()
 
-        logger.info("Cleaned data inserted into the database")
+        # Only cached once committed, so a rollback can't leave IDs behind
+        self._locations.remember(resolved)
+
+        logger.info(
+            f"{len(inserted)} of {len(data)} cleaned rows inserted into the database"
+        )
+        return inserted
 
-    async def _transport(self, data: List[dict]) -> None:
-        logger.info("Transporting cleaned data to chart generator")
-        await REDIS_CLIENT.publish(CLEANED_DATA_KEY, json.dumps(data))
+    @staticmethod
+    def _batch_id(entries: List[Entry]) -> str:
+        """
+        Derives the batch ID from the entries the batch was built from,
+        so a batch retried after a crash is published under the same ID.
+        """
+        ids: str = ",".join(sorted(entry_id for entry_id, _ in entries))
+        return hashlib.sha1(ids.encode()).hexdigest()
+
+    async def _transport(self, data: List[dict], batch_id: str) -> None:
+        if not data:
+            return
+
+        logger.info(f"Transporting batch {batch_id} to chart generator")
+        await self._log.publish(data, batch_id)
+
+        async with get_db_session() as sess:
+            await sess.execute(
+                update(CleanedDataOutbox)
+                .where(CleanedDataOutbox.batch_id == batch_id)
+                .values(data=None, published_at=datetime.now())
+            )
+
+    async def _drain_outbox(self) -> None:
+        """
+        Publishes batches committed more than `outbox_interval` seconds
+        ago which were never published, and prunes published batches
+        past their retention. A batch published twice is recognised by
+        its ID and skipped by the chart generator.
+        """
+        self._outbox_drained_at = time.monotonic()
+        now: datetime = datetime.now()
+
+        try:
+            async with get_db_session() as sess:
+                res = await sess.execute(
+                    select(CleanedDataOutbox.batch_id, CleanedDataOutbox.data)
+                    .where(
+                        CleanedDataOutbox.published_at.is_(None),
+                        CleanedDataOutbox.created_at
+                        < now - timedelta(seconds=self._outbox_interval),
+                    )
+                    .order_by(CleanedDataOutbox.created_at)
+                    .limit(100)
+                    .with_for_update(skip_locked=True)
+                )
+                batches: list[tuple[str, list[dict]]] = res.all()
+
+                for batch_id, data in batches:
+                    logger.info(f"Republishing batch {batch_id} from the outbox")
+                    await self._log.publish(data, batch_id)
+
+                if batches:
+                    await sess.execute(
+                        update(CleanedDataOutbox)
+                        .where(
+                            CleanedDataOutbox.batch_id.in_(
+                                [batch_id for batch_id, _ in batches]
+                            )
+                        )
+                        .values(data=None, published_at=now)
+                    )
+                await sess.execute(
+                    delete(CleanedDataOutbox).where(
+                        CleanedDataOutbox.published_at
+                        < now - timedelta(seconds=OUTBOX_RETENTION)
+                    )
+                )
+                await sess.commit()
+        except Exception as e:
+            logger.error(f"[{self._name}] Outbox drain failed: {type(e)} - {str(e)}")
@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class ScrapingError(Exception):
     # Raised when an error occurs whilst scraping a card
     def __init__(self, message):
@@ -7,6 +10,21 @@ class ScrapingError(Exception):
 
 class LLMError(Exception):
     # Raised when an error occurs whilst interacting with the LLM API
-    def __init__(self, message):
+    def __init__(
+        self,
+        message,
+        *,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
         self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
         super().__init__(self.message)
+
+    @property
+    def is_retryable(self) -> bool:
+        # Rate limited or the upstream is struggling
+        return self.status_code is not None and (
+            self.status_code == 429 or self.status_code >= 500
+        )
@@ -0,0 +1,80 @@
+import logging
+
+from html.parser import HTMLParser
+from typing import Iterable
+
+
+logger = logging.getLogger(__name__)
+
+# Tags whose content is never visible text
+SKIP_TAGS = frozenset(
+    {"script", "style", "noscript", "template", "svg", "iframe", "head", "button"}
+)
+
+# Tags which start a new line of text
+BLOCK_TAGS = frozenset(
+    (
+        "address article aside blockquote br dd div dl dt footer form h1 h2 h3 "
+        "h4 h5 h6 header hr li main nav ol p pre section table tr ul"
+    ).split()
+)
+
+
+class HTMLCompactor(HTMLParser):
+    """
+    Incremental HTML to text converter. Markup, attributes and
+    non visible elements are dropped, whitespace is collapsed and
+    lines which have already been emitted are skipped, which removes
+    repeated boilerplate such as "Show more" or duplicated headers.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._line: list[str] = []
+        self._lines: list[str] = []
+        self._seen: set[str] = set()
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+            if tag == "li":
+                self._line.append("-")
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self._line.extend(data.split())
+
+    def _flush(self) -> None:
+        line = " ".join(self._line)
+        self._line.clear()
+
+        if not line or line == "-" or line in self._seen:
+            return
+
+        self._seen.add(line)
+        self._lines.append(line)
+
+    def feed_all(self, chunks: Iterable[str]) -> str:
+        for chunk in chunks:
+            self.feed(chunk)
+        self.close()
+        self._flush()
+        return "\n".join(self._lines)
+
+
+def compact_html(html: str) -> str:
+    """Converts an HTML fragment into compact, deduplicated text."""
+    return HTMLCompactor().feed_all((html,))
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from config import INDUSTRY_CACHE_PREFIX, INDUSTRY_CACHE_TTL, REDIS_CLIENT
+from .lru_cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalise_company_url(url: str) -> str:
+    """Reduces a company URL to its /company/<slug>/ root."""
+    parsed = urlparse(url)
+    parts: list[str] = [p for p in parsed.path.split("/") if p]
+    path = "/".join(parts[:2]) if parts[:1] == ["company"] else "/".join(parts)
+    return f"{parsed.netloc}/{path}/".lower()
+
+
+class IndustryCache:
+    """
+    Caches the industry of a company keyed on its URL, in process
+    and in Redis. Unknown companies are resolved in the background
+    with `fetch`, concurrent lookups of the same company share a
+    single fetch.
+
+    Attributes:
+        fetch (Callable[[str], Awaitable[Optional[str]]]): Resolves the industry of a company URL.
+        redis (Redis): The Redis client used for the persistent tier.
+        ttl (int): The time in seconds entries live for in both tiers.
+        max_size (int): The maximum number of entries in the in-process tier.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[str]]],
+        *,
+        redis: Optional[Redis] = REDIS_CLIENT,
+        ttl: int = INDUSTRY_CACHE_TTL,
+        max_size: int = 5000,
+    ) -> None:
+        self._fetch = fetch
+        self._redis = redis
+        self._ttl = ttl
+        self._local = LRUCache(max_size=max_size, ttl=ttl)
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def resolve(self, company_url: str) -> asyncio.Task:
+        """
+        Returns a task resolving to the industry of the company. The
+        task starts immediately so callers can carry on scraping.
+        """
+        key: str = normalise_company_url(company_url)
+
+        if (task := self._in_flight.get(key)) is not None:
+            return task
+
+        task = asyncio.create_task(self._resolve(key, company_url))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    async def _resolve(self, key: str, company_url: str) -> Optional[str]:
+        if (industry := self._local.get(key)) is not None:
+            return industry
+
+        redis_key = f"{INDUSTRY_CACHE_PREFIX}:{key}"
+
+        if self._redis is not None:
+            try:
+                industry = await self._redis.get(redis_key)
+            except RedisError as e:
+                logger.warning(f"Industry cache lookup failed: {e}")
+
+            if industry is not None:
+                if isinstance(industry, bytes):
+                    industry = industry.decode()
+                self._local.set(key, industry)
+                return industry
+
+        industry = await self._fetch(company_url)
+        if industry is None:
+            return None
+
+        self._local.set(key, industry)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(redis_key, industry, ex=self._ttl)
+            except RedisError as e:
+                logger.warning(f"Industry cache write failed: {e}")
+
+        return industry
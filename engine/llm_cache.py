@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from typing import Optional
+
+from config import LLM_CACHE_PREFIX, LLM_CACHE_TTL, REDIS_CLIENT
+from .lru_cache import LRUCache
+from .models import InitialExtractedObject
+
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Two tier cache of LLM extraction results keyed on the normalised
+    content of a listing. Lookups hit the in-process LRU first and
+    fall back to Redis, which is shared between runs and scrapers.
+    Redis failures are logged and treated as misses.
+
+    Attributes:
+        prompt_version (int): Version of the prompt the results came from.
+        redis (Redis): The Redis client used for the persistent tier.
+        ttl (int): The time in seconds entries live for in both tiers.
+        max_size (int): The maximum number of entries in the in-process tier.
+    """
+
+    def __init__(
+        self,
+        prompt_version: int,
+        *,
+        redis: Optional[Redis] = REDIS_CLIENT,
+        ttl: int = LLM_CACHE_TTL,
+        max_size: int = 10_000,
+    ) -> None:
+        self._prompt_version = prompt_version
+        self._redis = redis
+        self._ttl = ttl
+        self._local = LRUCache(max_size=max_size, ttl=ttl)
+        self._hits = 0
+        self._misses = 0
+
+    def key_for(self, payload: InitialExtractedObject) -> str:
+        normalised: str = " ".join(
+            f"{payload.title}\x00{payload.content}".split()
+        ).casefold()
+        digest = hashlib.sha256(normalised.encode()).hexdigest()
+        return f"{LLM_CACHE_PREFIX}:v{self._prompt_version}:{digest}"
+
+    async def get(self, payload: InitialExtractedObject) -> Optional[dict]:
+        key = self.key_for(payload)
+
+        if (value := self._local.get(key)) is not None:
+            self._hits += 1
+            return value
+
+        if self._redis is not None:
+            try:
+                prev: Optional[str] = await self._redis.get(key)
+            except RedisError as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+                prev = None
+
+            if prev is not None:
+                value = json.loads(prev)
+                self._local.set(key, value)
+                self._hits += 1
+                return value
+
+        self._misses += 1
+        return None
+
+    async def set(self, payload: InitialExtractedObject, value: dict) -> None:
+        key = self.key_for(payload)
+        self._local.set(key, value)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(value), ex=self._ttl)
+            except RedisError as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "local_size": len(self._local),
+        }
@@ -0,0 +1,36 @@
+from httpx import AsyncClient, AsyncHTTPTransport, Limits, Timeout
+
+from config import (
+    LLM_API_KEY,
+    LLM_CONNECT_RETRIES,
+    LLM_HTTP2,
+    LLM_MAX_CONNECTIONS,
+    LLM_TIMEOUT,
+)
+
+
+def create_llm_client(
+    *,
+    max_connections: int = LLM_MAX_CONNECTIONS,
+    http2: bool = LLM_HTTP2,
+    timeout: float = LLM_TIMEOUT,
+    retries: int = LLM_CONNECT_RETRIES,
+) -> AsyncClient:
+    """
+    Creates a pooled client for the LLM API. The client is meant to live
+    for as long as its owner so connections and TLS sessions are reused
+    between requests. `retries` only covers failures to connect, rate
+    limits and server errors are retried by the caller.
+    """
+    return AsyncClient(
+        headers={"Authorization": f"Bearer {LLM_API_KEY}"},
+        timeout=Timeout(timeout, connect=min(timeout, 10.0)),
+        transport=AsyncHTTPTransport(
+            http2=http2,
+            retries=retries,
+            limits=Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        ),
+    )
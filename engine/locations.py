@@ -0,0 +1,306 @@
+import logging
+import re
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from typing import Iterable, NamedTuple, Optional
+
+from db_models import Location, LocationAlias
+from .lru_cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+UNITED_KINGDOM = "United Kingdom"
+UNITED_STATES = "United States"
+
+COUNTRY_ALIASES: dict[str, str] = {
+    "uk": UNITED_KINGDOM,
+    "u.k.": UNITED_KINGDOM,
+    "gb": UNITED_KINGDOM,
+    "great britain": UNITED_KINGDOM,
+    "united kingdom": UNITED_KINGDOM,
+    "us": UNITED_STATES,
+    "usa": UNITED_STATES,
+    "u.s.": UNITED_STATES,
+    "united states": UNITED_STATES,
+    "united states of america": UNITED_STATES,
+    "ireland": "Ireland",
+    "germany": "Germany",
+    "france": "France",
+    "netherlands": "Netherlands",
+}
+
+REGIONS: dict[str, tuple[str, str]] = {
+    "england": ("England", UNITED_KINGDOM),
+    "scotland": ("Scotland", UNITED_KINGDOM),
+    "wales": ("Wales", UNITED_KINGDOM),
+    "northern ireland": ("Northern Ireland", UNITED_KINGDOM),
+}
+
+# Cities whose region and country are filled in when a posting omits them
+CITIES: dict[str, tuple[str, str, str]] = {
+    "london": ("London", "England", UNITED_KINGDOM),
+    "manchester": ("Manchester", "England", UNITED_KINGDOM),
+    "birmingham": ("Birmingham", "England", UNITED_KINGDOM),
+    "leeds": ("Leeds", "England", UNITED_KINGDOM),
+    "bristol": ("Bristol", "England", UNITED_KINGDOM),
+    "cambridge": ("Cambridge", "England", UNITED_KINGDOM),
+    "oxford": ("Oxford", "England", UNITED_KINGDOM),
+    "reading": ("Reading", "England", UNITED_KINGDOM),
+    "brighton": ("Brighton", "England", UNITED_KINGDOM),
+    "newcastle upon tyne": ("Newcastle upon Tyne", "England", UNITED_KINGDOM),
+    "sheffield": ("Sheffield", "England", UNITED_KINGDOM),
+    "nottingham": ("Nottingham", "England", UNITED_KINGDOM),
+    "liverpool": ("Liverpool", "England", UNITED_KINGDOM),
+    "edinburgh": ("Edinburgh", "Scotland", UNITED_KINGDOM),
+    "glasgow": ("Glasgow", "Scotland", UNITED_KINGDOM),
+    "cardiff": ("Cardiff", "Wales", UNITED_KINGDOM),
+    "belfast": ("Belfast", "Northern Ireland", UNITED_KINGDOM),
+    "dublin": ("Dublin", "Leinster", "Ireland"),
+}
+
+WORK_MODE_PATTERNS: tuple[tuple[str, re.Pattern], ...] = (
+    ("hybrid", re.compile(r"\bhybrid\b")),
+    ("remote", re.compile(r"\b(remote|work from home|wfh)\b")),
+    ("onsite", re.compile(r"\b(on-?site|in[- ]office)\b")),
+)
+
+SEPARATOR_PATTERN = re.compile(r"[,/|·•]|\s[-–]\s")
+
+# "(+3 others)", "(Hybrid)", "Greater London Area" and the like
+NOISE_PATTERN = re.compile(
+    r"\([^)]*\)|\b(greater|city of|area|metropolitan|hybrid|remote|on-?site|"
+    r"in[- ]office|work from home|wfh)\b"
+)
+
+
+class ParsedLocation(NamedTuple):
+    city: Optional[str]
+    region: Optional[str]
+    country: Optional[str]
+    work_mode: Optional[str]  # "onsite", "remote", "hybrid" or None if unstated
+
+    @property
+    def key(self) -> str:
+        """Identifies the place regardless of work mode."""
+        return "|".join(part or "" for part in (self.city, self.region, self.country))
+
+    @property
+    def is_empty(self) -> bool:
+        return self.city is None and self.region is None and self.country is None
+
+    @property
+    def parent(self) -> Optional["ParsedLocation"]:
+        """The region or country containing the place, if known."""
+        if self.city is not None and (self.region or self.country):
+            return ParsedLocation(None, self.region, self.country, None)
+        if self.city is None and self.region is not None and self.country:
+            return ParsedLocation(None, None, self.country, None)
+        return None
+
+    @property
+    def lineage(self) -> list["ParsedLocation"]:
+        """The place followed by each place containing it."""
+        places: list[ParsedLocation] = []
+        place: Optional[ParsedLocation] = self
+        while place is not None and not place.is_empty:
+            places.append(place)
+            place = place.parent
+        return places
+
+
+class ResolvedLocation(NamedTuple):
+    location_id: Optional[int]
+    work_mode: Optional[str]
+    # IDs of the region and country containing the location, innermost first
+    ancestors: tuple[int, ...] = ()
+
+
+def parse_location(raw: str) -> ParsedLocation:
+    """
+    Parses a free text location such as "London, UK (+3 others)" or
+    "Manchester Area, United Kingdom (Hybrid)" into its canonical
+    city, region and country alongside the work mode.
+    """
+    text: str = raw.strip().lower()
+
+    work_mode: Optional[str] = next(
+        (mode for mode, pattern in WORK_MODE_PATTERNS if pattern.search(text)), None
+    )
+
+    city = region = country = None
+    parts: list[str] = [
+        " ".join(part.split()).strip(" -")
+        for part in SEPARATOR_PATTERN.split(NOISE_PATTERN.sub(" ", text))
+    ]
+
+    for part in filter(None, parts):
+        if part in COUNTRY_ALIASES:
+            country = COUNTRY_ALIASES[part]
+        elif part in REGIONS:
+            region, country = REGIONS[part][0], country or REGIONS[part][1]
+        elif part in CITIES:
+            city, region, country = CITIES[part]
+        elif city is None:
+            city = part.title()
+
+    return ParsedLocation(city, region, country, work_mode)
+
+
+class LocationResolver:
+    """
+    Resolves the raw location strings of postings to rows of the
+    locations dimension. Raw strings are looked up in process first,
+    then in location_aliases, and only parsed once when neither knows
+    them, so each distinct string is parsed once across every cleaner.
+
+    Cities are linked to the region and country containing them, which
+    are added as locations of their own, so stats can be rolled up to
+    every level and a filter on "UK" covers London.
+
+    Locations added by `resolve` are only cached in process once the
+    caller hands them to `remember` after committing, so a rolled back
+    transaction can't leave IDs behind which don't exist.
+
+    Attributes:
+        max_size (int): The maximum number of raw strings cached in process.
+    """
+
+    def __init__(self, *, max_size: int = 10_000) -> None:
+        self._aliases = LRUCache(max_size=max_size, ttl=24 * 60 * 60)
+        self._keys = LRUCache(max_size=max_size, ttl=24 * 60 * 60)
+
+    async def resolve(
+        self, sess: AsyncSession, raws: Iterable[str]
+    ) -> dict[str, ResolvedLocation]:
+        """
+        Returns the location, work mode and containing locations of each
+        raw location, adding those seen for the first time to the lookup
+        table within `sess`.
+        """
+        resolved: dict[str, ResolvedLocation] = {}
+        misses: set[str] = set()
+
+        for raw in set(raws):
+            if (cached := self._aliases.get(raw)) is not None:
+                resolved[raw] = cached
+            else:
+                misses.add(raw)
+
+        if misses:
+            parent = aliased(Location)
+            res = await sess.execute(
+                select(
+                    LocationAlias.raw,
+                    LocationAlias.location_id,
+                    LocationAlias.work_mode,
+                    Location.parent_id,
+                    parent.parent_id,
+                )
+                .outerjoin(Location, Location.id == LocationAlias.location_id)
+                .outerjoin(parent, parent.id == Location.parent_id)
+                .where(LocationAlias.raw.in_(misses))
+            )
+            for raw, location_id, work_mode, *ancestors in res.all():
+                resolved[raw] = ResolvedLocation(
+                    location_id, work_mode, tuple(filter(None, ancestors))
+                )
+                misses.discard(raw)
+
+        if misses:
+            resolved.update(await self._add(sess, misses))
+
+        return resolved
+
+    def remember(self, resolved: dict[str, ResolvedLocation]) -> None:
+        """Caches locations returned by `resolve` once they're committed."""
+        for raw, location in resolved.items():
+            self._aliases.set(raw, location)
+
+    async def location_id(self, sess: AsyncSession, location: str) -> Optional[int]:
+        """
+        Returns the ID of a location typed by a user, without adding
+        anything to the lookup table.
+        """
+        parsed: ParsedLocation = parse_location(location)
+        if parsed.is_empty:
+            return None
+
+        if (cached := self._keys.get(parsed.key)) is not None:
+            return cached
+
+        location_id: Optional[int] = (
+            await sess.execute(select(Location.id).where(Location.key == parsed.key))
+        ).scalar()
+        if location_id is not None:
+            self._keys.set(parsed.key, location_id)
+        return location_id
+
+    async def _add(
+        self, sess: AsyncSession, raws: set[str]
+    ) -> dict[str, ResolvedLocation]:
+        parsed: dict[str, ParsedLocation] = {raw: parse_location(raw) for raw in raws}
+        places: dict[str, ParsedLocation] = {
+            place.key: place for p in parsed.values() for place in p.lineage
+        }
+
+        ids: dict[str, int] = {}
+        if places:
+            await sess.execute(
+                insert(Location)
+                .values(
+                    [
+                        {"key": key, "city": p.city, "region": p.region, "country": p.country}
+                        for key, p in sorted(places.items())
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=["key"])
+            )
+            res = await sess.execute(
+                select(Location.key, Location.id).where(Location.key.in_(places))
+            )
+            ids = dict(res.all())
+
+            # Only ever set once, as a key always has the same parent
+            parents: list[dict] = [
+                {"child": ids[key], "parent": ids[p.parent.key]}
+                for key, p in sorted(places.items())
+                if p.parent is not None
+            ]
+            if parents:
+                locations = Location.__table__
+                await sess.execute(
+                    update(locations)
+                    .where(
+                        locations.c.id == bindparam("child"),
+                        locations.c.parent_id.is_(None),
+                    )
+                    .values(parent_id=bindparam("parent")),
+                    parents,
+                )
+
+        resolved: dict[str, ResolvedLocation] = {
+            raw: ResolvedLocation(
+                None if p.is_empty else ids[p.key],
+                p.work_mode,
+                tuple(ids[place.key] for place in p.lineage[1:]),
+            )
+            for raw, p in parsed.items()
+        }
+
+        await sess.execute(
+            insert(LocationAlias)
+            .values(
+                [
+                    {"raw": raw, "location_id": r.location_id, "work_mode": r.work_mode}
+                    for raw, r in sorted(resolved.items())
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["raw"])
+        )
+
+        logger.info(f"Added {len(resolved)} locations to the lookup table")
+        return resolved
@@ -0,0 +1,42 @@
+import time
+
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class LRUCache:
+    """
+    In-process LRU cache with per-entry expiry.
+
+    Attributes:
+        max_size (int): The maximum number of entries held before evicting.
+        ttl (float): The time in seconds an entry lives for.
+    """
+
+    def __init__(self, *, max_size: int = 10_000, ttl: float = 3600) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
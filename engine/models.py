@@ -1,4 +1,3 @@
-import json
 from typing import List, Optional
 from pydantic import BaseModel, field_serializer, field_validator
 
@@ -34,12 +33,6 @@ class LLMExtractedObject(CustomBaseModel):
     requirements: List[str]
     extras: Optional[List[str]] = None
 
-    @field_serializer(
-        "programming_languages", "responsibilities", "requirements", "extras"
-    )
-    def serialize_list(self, value: Optional[List[str]]) -> str:
-        return json.dumps(value) if value is not None else None
-
 
 class CleanedDataObject(CustomBaseModel):
     url: str
@@ -47,8 +40,11 @@ class CleanedDataObject(CustomBaseModel):
     company: str
     industry: Optional[str] = None
     salary: Optional[float] = None
+    currency: Optional[str] = None
     location: str
-    programming_languages: str
-    responsibilities: Optional[str] = None
-    requirements: str
-    extras: Optional[str] = None
+    location_id: Optional[int] = None
+    work_mode: Optional[str] = None
+    programming_languages: List[str]
+    responsibilities: Optional[List[str]] = None
+    requirements: List[str]
+    extras: Optional[List[str]] = None
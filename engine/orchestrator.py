@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from pydantic import ConfigDict
+from typing import Optional
+
+from .browser import BrowserPool
+from .models import CustomBaseModel
+from .scrapers import BaseScraper
+from .transport import BaseTransport
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeJob(CustomBaseModel):
+    """
+    A search to scrape.
+
+    Attributes:
+        scraper (type[BaseScraper]): The scraper class to run the search with.
+        url (str): The search URL.
+        interval (float | None): The time in seconds between the end of one run
+            and the start of the next. The search is only run once if None.
+        options (dict): Keyword arguments passed to the scraper.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    scraper: type[BaseScraper]
+    url: str
+    interval: Optional[float] = None
+    options: dict = {}
+
+
+class ScrapeOrchestrator:
+    """
+    Runs several scrape jobs concurrently within a single browser,
+    each scraper working in its own pooled context. All scrapers push
+    to the same transport.
+
+    Attributes:
+        jobs (list[ScrapeJob]): The jobs to schedule.
+        transport (BaseTransport): The transport used to send data to the cleaners.
+        max_concurrency (int): The maximum number of scrapers running at once.
+    """
+
+    def __init__(
+        self,
+        jobs: list[ScrapeJob],
+        transport: BaseTransport,
+        *,
+        max_concurrency: int = 2,
+    ) -> None:
+        self._jobs = jobs
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pool = BrowserPool(max_contexts=max_concurrency)
+
+    async def run(self) -> None:
+        async with self._pool:
+            await asyncio.gather(*(self._schedule(job) for job in self._jobs))
+
+    async def _schedule(self, job: ScrapeJob) -> None:
+        while True:
+            async with (
+                self._semaphore,
+                self._pool.context(job.scraper.RESOURCE_ALLOW_LIST) as ctx,
+            ):
+                logger.info(f"Starting {job.scraper.__name__} on {job.url}")
+                scraper: BaseScraper = job.scraper(
+                    job.url, self._transport, browser=ctx, **job.options
+                )
+                await scraper.run()
+                logger.info(f"Finished {job.scraper.__name__} on {job.url}")
+
+            if job.interval is None:
+                return
+
+            await asyncio.sleep(job.interval)
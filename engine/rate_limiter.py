@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter with a cap on in-flight requests.
+
+    Tokens refill at `rate` per second up to `burst`. Every acquisition
+    consumes a token and holds an in-flight slot until released. The
+    effective rate is halved on `backoff` and additively restored on
+    `recover`, never exceeding the configured rate.
+
+    Attributes:
+        rate (float): Maximum number of requests per second.
+        max_in_flight (int): Maximum number of concurrent requests.
+        burst (int): Maximum number of tokens that can accumulate.
+        min_rate (float): Floor for the effective rate whilst backing off.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        max_in_flight: int = 4,
+        burst: Optional[int] = None,
+        min_rate: float = 0.05,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self._max_rate = rate
+        self._rate = rate
+        self._min_rate = min(min_rate, rate)
+        self._burst = burst or max(1, int(rate))
+        self._tokens = float(self._burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self) -> "TokenBucket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.release()
+
+    async def acquire(self) -> None:
+        await self._slots.acquire()
+
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    wait = max(
+                        self._blocked_until - now, (1 - self._tokens) / self._rate
+                    )
+                    await asyncio.sleep(wait)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def backoff(self, retry_after: Optional[float] = None) -> None:
+        """Halves the effective rate and pauses acquisitions."""
+        self._rate = max(self._min_rate, self._rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+        pause = retry_after if retry_after is not None else 1 / self._rate
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def recover(self) -> None:
+        """Additively restores the effective rate towards the configured rate."""
+        self._rate = min(self._max_rate, self._rate + self._max_rate * 0.1)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+        self._last_refill = now
+
+    @property
+    def rate(self) -> float:
+        return self._rate
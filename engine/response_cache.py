@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from typing import Any, Awaitable, Callable, Optional
+
+from config import (
+    REDIS_CLIENT,
+    RESPONSE_CACHE_CHANNEL,
+    RESPONSE_CACHE_INVALIDATION_INTERVAL,
+    RESPONSE_CACHE_PREFIX,
+    RESPONSE_CACHE_STALE_TTL,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_VERSION_KEY,
+)
+from .lru_cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+# Deletes a lock only whilst it still holds the token it was taken with
+UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def invalidate_responses(
+    redis: Redis = REDIS_CLIENT,
+    *,
+    version_key: str = RESPONSE_CACHE_VERSION_KEY,
+    channel: str = RESPONSE_CACHE_CHANNEL,
+) -> None:
+    """
+    Marks every response cached under `version_key` stale, called once
+    the data they're computed from has changed. Entries are kept and
+    served until they're refreshed.
+    """
+    try:
+        version: int = await redis.incr(version_key)
+        await redis.publish(channel, version)
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate cached responses: {e}")
+
+
+class ResponseInvalidator:
+    """
+    Rate limits `invalidate_responses` for callers which change the
+    data far more often than responses need refreshing. Changes are
+    marked as they're made and each `flush` bumps the version if any
+    are pending and `interval` seconds have passed since the last bump,
+    so later changes are invalidated by a later flush rather than lost.
+
+    Attributes:
+        redis (Redis): The Redis client holding the version.
+        version_key (str): The key holding the data version.
+        channel (str): The channel version bumps are published on.
+        interval (float): The minimum time in seconds between bumps.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Redis = REDIS_CLIENT,
+        version_key: str = RESPONSE_CACHE_VERSION_KEY,
+        channel: str = RESPONSE_CACHE_CHANNEL,
+        interval: float = RESPONSE_CACHE_INVALIDATION_INTERVAL,
+    ) -> None:
+        self._redis = redis
+        self._version_key = version_key
+        self._channel = channel
+        self._interval = interval
+        self._pending = False
+        self._invalidated_at = -interval
+
+    def mark(self) -> None:
+        """Records that the data responses are computed from has changed."""
+        self._pending = True
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        if time.monotonic() - self._invalidated_at < self._interval:
+            return
+
+        self._pending = False
+        self._invalidated_at = time.monotonic()
+        await invalidate_responses(
+            self._redis, version_key=self._version_key, channel=self._channel
+        )
+
+
+class ResponseCache:
+    """
+    Stale-while-revalidate cache of API responses, in process and in
+    Redis. An entry is fresh for `ttl` seconds and until the data
+    version is bumped by `invalidate_responses`, after which it's still
+    served for up to `stale_ttl` seconds whilst a single background task
+    recomputes it. Concurrent misses of the same key share one
+    computation within a process, and a short Redis lock stops other
+    processes recomputing it at the same time.
+
+    The data version is held in process and kept current through a
+    Redis channel, so hot keys are answered without a round trip.
+    Caches of responses computed from data which changes at different
+    times are given their own version key and channel.
+
+    Attributes:
+        redis (Redis): The Redis client used for the shared tier.
+        version_key (str): The key holding the data version.
+        channel (str): The channel version bumps are published on.
+        ttl (int): The time in seconds an entry is fresh for.
+        stale_ttl (int): The time in seconds a stale entry is still served for.
+        max_size (int): The maximum number of entries in the in-process tier.
+        lock_timeout (float): The time in seconds another process may spend computing a key.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Redis = REDIS_CLIENT,
+        version_key: str = RESPONSE_CACHE_VERSION_KEY,
+        channel: str = RESPONSE_CACHE_CHANNEL,
+        ttl: int = RESPONSE_CACHE_TTL,
+        stale_ttl: int = RESPONSE_CACHE_STALE_TTL,
+        max_size: int = 2000,
+        lock_timeout: float = 10.0,
+    ) -> None:
+        self._redis = redis
+        self._version_key = version_key
+        self._channel = channel
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._local = LRUCache(max_size=max_size, ttl=ttl + stale_ttl)
+        self._lock_timeout = lock_timeout
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._version = 0
+        self._is_running = False
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key_for(name: str, *args: Any) -> str:
+        """
+        Hashes the arguments of a request, so keys stay a fixed size
+        whatever the client sends.
+        """
+        digest = hashlib.sha1(json.dumps(args, default=str).encode()).hexdigest()
+        return f"{RESPONSE_CACHE_PREFIX}:{name}:{digest}"
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached value of `key`, computing it with `compute`
+        if there's none. Values must be JSON serialisable.
+        """
+        await self._ensure_listener()
+
+        entry: Optional[dict] = self._local.get(key)
+        if entry is None:
+            entry = await self._read(key)
+            if entry is not None:
+                self._local.set(key, entry)
+
+        if entry is None or self._age(entry) > self._ttl + self._stale_ttl:
+            entry = await self._compute(key, compute)
+            return entry["value"]
+
+        if not self._is_fresh(entry):
+            self._refresh(key, compute)
+        return entry["value"]
+
+    def _age(self, entry: dict) -> float:
+        return time.time() - entry["stored_at"]
+
+    def _is_fresh(self, entry: dict) -> bool:
+        return entry["version"] >= self._version and self._age(entry) <= self._ttl
+
+    def _refresh(self, key: str, compute: Callable[[], Awaitable[Any]]) -> None:
+        if key not in self._in_flight:
+            self._start(key, self._recompute(key, compute, wait=False))
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> dict:
+        task: Optional[asyncio.Task] = self._in_flight.get(key)
+        if task is None:
+            task = self._start(key, self._recompute(key, compute, wait=True))
+
+        entry: Optional[dict] = await task
+        if entry is None:
+            # Joined a refresh which failed or was left to another process
+            entry = await self._recompute(key, compute, wait=True)
+        return entry
+
+    def _start(self, key: str, coro: Awaitable[Optional[dict]]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        # A newer task may have been started for the key since
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def _recompute(
+        self, key: str, compute: Callable[[], Awaitable[Any]], *, wait: bool
+    ) -> Optional[dict]:
+        """
+        Computes and stores the value of `key`. If another process holds
+        the lock, a refresh is left to it and a miss waits for its result,
+        computing it anyway if none arrives in time. Failed refreshes
+        are logged and the stale entry kept.
+        """
+        version: int = self._version
+
+        if not wait:
+            # Another process may already have refreshed it
+            entry = await self._read(key)
+            if entry is not None and self._is_fresh(entry):
+                self._local.set(key, entry)
+                return entry
+
+        if (token := await self._lock(key)) is None:
+            if not wait:
+                return None
+
+            deadline: float = time.monotonic() + self._lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self._read(key)
+                if entry is not None and entry["version"] >= version:
+                    self._local.set(key, entry)
+                    return entry
+
+        try:
+            try:
+                value: Any = await compute()
+            except Exception as e:
+                logger.error(f"Failed to compute {key}: {e}")
+                if wait:
+                    raise
+                return None
+
+            entry = {"value": value, "version": version, "stored_at": time.time()}
+            self._local.set(key, entry)
+            try:
+                await self._redis.set(
+                    key, json.dumps(entry), ex=self._ttl + self._stale_ttl
+                )
+            except RedisError as e:
+                logger.warning(f"Response cache write failed: {e}")
+        finally:
+            if token is not None:
+                await self._unlock(key, token)
+
+        return entry
+
+    async def _lock(self, key: str) -> Optional[str]:
+        """
+        Takes the lock on computing `key`, returning the token it's
+        held with, None if another process holds it.
+        """
+        token: str = uuid.uuid4().hex
+        try:
+            locked = await self._redis.set(
+                f"{key}:lock", token, nx=True, px=int(self._lock_timeout * 1000)
+            )
+        except RedisError as e:
+            logger.warning(f"Response cache lock failed: {e}")
+            return token
+        return token if locked else None
+
+    async def _unlock(self, key: str, token: str) -> None:
+        # A computation which outlived the lock mustn't release the next holder's
+        try:
+            await self._redis.eval(UNLOCK_SCRIPT, 1, f"{key}:lock", token)
+        except RedisError as e:
+            logger.warning(f"Response cache unlock failed: {e}")
+
+    async def _read(self, key: str) -> Optional[dict]:
+        try:
+            prev: Optional[str | bytes] = await self._redis.get(key)
+        except RedisError as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+        return json.loads(prev) if prev is not None else None
+
+    async def _ensure_listener(self) -> None:
+        if self._is_running:
+            return
+
+        self._is_running = True
+        await self._read_version()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _read_version(self) -> None:
+        try:
+            version = await self._redis.get(self._version_key)
+        except RedisError as e:
+            logger.warning(f"Failed to read response cache version: {e}")
+            return
+        self._version = max(self._version, int(version or 0))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as ps:
+                    await ps.subscribe(self._channel)
+                    # Bumps missed whilst unsubscribed
+                    await self._read_version()
+
+                    async for message in ps.listen():
+                        if message["type"] == "message":
+                            self._version = max(self._version, int(message["data"]))
+            except RedisError as e:
+                logger.warning(f"Response cache invalidations lost: {e}")
+                await asyncio.sleep(1)
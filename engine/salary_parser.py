@@ -0,0 +1,174 @@
+import regex
+
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+
+# Multipliers used to annualise a salary quoted per period
+HOURS_PER_YEAR = 37.5 * 52
+DAYS_PER_YEAR = 220
+PERIOD_MULTIPLIERS: dict[str, float] = {
+    "hour": HOURS_PER_YEAR,
+    "day": DAYS_PER_YEAR,
+    "week": 52,
+    "month": 12,
+    "year": 1,
+}
+
+CURRENCY_SYMBOLS: dict[str, str] = {"£": "GBP", "$": "USD", "€": "EUR"}
+
+CURRENCY_PATTERN = regex.compile(r"[£$€]|\b(gbp|usd|eur)\b")
+
+PERIOD_PATTERNS: tuple[tuple[str, regex.Pattern], ...] = (
+    ("hour", regex.compile(r"\b(hour|hr|hourly|ph|p/h)\b|/\s*(h|hr|hour)\b")),
+    ("day", regex.compile(r"\b(day|daily|pd|p/d)\b|/\s*(d|day)\b")),
+    ("week", regex.compile(r"\b(week|weekly|wk|pw|p/w)\b|/\s*(w|wk|week)\b")),
+    ("month", regex.compile(r"\b(month|monthly|pcm|pm|mo)\b|/\s*(m|mo|month)\b")),
+    ("year", regex.compile(r"\b(year|yearly|annum|annual|annually|pa|p\.a|yr)\b")),
+)
+
+AMOUNT = r"(\d+(?:\.\d+)?)\s*(k|m)?"
+RANGE_PATTERN = regex.compile(
+    rf"{AMOUNT}\s*(?:-|to)\s*(?:[£$€]|gbp|usd|eur)?\s*{AMOUNT}\b"
+)
+AMOUNT_PATTERN = regex.compile(rf"{AMOUNT}\b")
+
+# A figure is only taken as a salary next to a currency, with a "k" or
+# on its own, so "1-3 years experience" and "12 months" aren't
+CURRENCY_BEFORE_PATTERN = regex.compile(r"(?:[£$€]|\b(?:gbp|usd|eur))\s*$")
+CURRENCY_AFTER_PATTERN = regex.compile(r"^\s*(?:gbp|usd|eur)\b")
+
+# What may sit between an amount and its period, "£500 per day", "£40/hr".
+# Period words elsewhere, "3 days a week in office", aren't pay periods
+PERIOD_CONNECTOR_PATTERN = regex.compile(r"\s*(?:(?:per|a|an)\s+|/\s*)?")
+
+# Figures which aren't amounts of money, "Competitive + 401k"
+NOT_AMOUNT_PATTERN = regex.compile(r"\b401\s*\(?k\)?")
+
+# Annual figures outside these are misreadings rather than salaries
+MIN_ANNUAL = 5_000
+MAX_ANNUAL = 1_000_000
+
+SEPARATORS = str.maketrans({",": "", "\u00a0": " ", "\u2013": "-", "\u2014": "-"})
+
+
+class ParsedSalary(NamedTuple):
+    amount: float  # As quoted, midpoint for ranges
+    currency: Optional[str]
+    period: str
+    annual: float
+
+
+def _to_amount(value: str, suffix: Optional[str]) -> float:
+    if suffix == "k":
+        return float(value) * 1_000
+    if suffix == "m":
+        return float(value) * 1_000_000
+    return float(value)
+
+
+def _is_amount(salary: str, matched: regex.Match) -> bool:
+    start, end = matched.span()
+    return (
+        "k" in matched.groups()
+        or CURRENCY_BEFORE_PATTERN.search(salary[:start]) is not None
+        or CURRENCY_AFTER_PATTERN.search(salary[end:]) is not None
+        or not (salary[:start] + salary[end:]).strip()
+    )
+
+
+def _find_amount(salary: str) -> Optional[regex.Match]:
+    """The first range, or failing that figure, which is an amount of money."""
+    for pattern in (RANGE_PATTERN, AMOUNT_PATTERN):
+        for matched in pattern.finditer(salary):
+            if _is_amount(salary, matched):
+                return matched
+    return None
+
+
+def _find_period(salary: str, end: int) -> Optional[str]:
+    """The period attached to the amount ending at `end`, if any."""
+    start: int = PERIOD_CONNECTOR_PATTERN.match(salary, end).end()
+
+    for name, pattern in PERIOD_PATTERNS:
+        if pattern.match(salary, start) is not None:
+            return name
+    return None
+
+
+@lru_cache(maxsize=8192)
+def _parse(salary: str) -> Optional[ParsedSalary]:
+    salary = NOT_AMOUNT_PATTERN.sub(" ", salary)
+
+    matched: Optional[regex.Match] = _find_amount(salary)
+    if matched is None:
+        return None
+
+    groups: tuple[str, ...] = matched.groups()
+    amounts: list[float] = [
+        _to_amount(*groups[i : i + 2]) for i in range(0, len(groups), 2)
+    ]
+
+    # Ranges where only the upper bound carries the suffix, "60 - 70k"
+    if len(amounts) == 2 and amounts[0] < 1000 <= amounts[1]:
+        amounts[0] *= 1000
+
+    amount = sum(amounts) / len(amounts)
+
+    currency: Optional[str] = None
+    if currency_matched := CURRENCY_PATTERN.search(salary):
+        currency = (
+            CURRENCY_SYMBOLS.get(currency_matched.group())
+            or currency_matched.group(1).upper()
+        )
+
+    period: Optional[str] = _find_period(salary, matched.end())
+    # Annual figures quoted bare and without a "k", "60 - 70"
+    if period is None and currency is None and amount < 1000:
+        amount *= 1000
+
+    annual: float = round(amount * PERIOD_MULTIPLIERS[period or "year"], 2)
+    if period not in (None, "year") and not MIN_ANNUAL <= annual <= MAX_ANNUAL:
+        # Salaries mislabelled with a period, "£45,000 per day"
+        annual = amount
+        period = None
+    period = period or "year"
+
+    if not MIN_ANNUAL <= annual <= MAX_ANNUAL:
+        return None
+
+    return ParsedSalary(amount=amount, currency=currency, period=period, annual=annual)
+
+
+def parse_salary(
+    salary: Optional[str], default_currency: Optional[str] = None
+) -> Optional[ParsedSalary]:
+    """
+    Parses a free text salary such as "£60,000 - £70,000", "$45/hour"
+    or "£500 per day" into its amount, currency and period alongside
+    the annualised figure. Returns None for salaries without a figure
+    such as "Competitive", or whose figure annualises to an implausible
+    salary.
+    """
+    if not salary:
+        return None
+
+    parsed: Optional[ParsedSalary] = _parse(salary.translate(SEPARATORS).lower())
+    if parsed is not None and parsed.currency is None and default_currency:
+        return parsed._replace(currency=default_currency)
+    return parsed
+
+
+def parse_salaries(
+    salaries: Iterable[Optional[str]], default_currency: Optional[str] = None
+) -> list[Optional[ParsedSalary]]:
+    """Parses a column of salaries, each distinct value is only parsed once."""
+    parsed: dict[Optional[str], Optional[ParsedSalary]] = {}
+    rtn_value: list[Optional[ParsedSalary]] = []
+
+    for salary in salaries:
+        if salary not in parsed:
+            parsed[salary] = parse_salary(salary, default_currency)
+        rtn_value.append(parsed[salary])
+
+    return rtn_value
@@ -0,0 +1,133 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from db_models import IndustrySalaryStats, LanguageSalaryStats
+from .quantile_sketch import QuantileSketch
+from .utils import LANGUAGE_ALIASES
+
+
+# Location ID of the rows holding the stats across every location
+ALL_LOCATIONS = 0
+
+# Keeps each upsert under Postgres's bind parameter limit
+UPSERT_BATCH_SIZE = 5000
+
+# Rollup tables alongside the column they're keyed on besides location
+ROLLUPS: tuple[tuple[type, str], ...] = (
+    (IndustrySalaryStats, "industry"),
+    (LanguageSalaryStats, "language"),
+)
+
+
+class SalaryStats:
+    """Count, sum and quantile sketch of the salaries in a bucket."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.sketch = QuantileSketch()
+
+    def add(self, salary: int) -> None:
+        self.count += 1
+        self.total += salary
+        self.sketch.add(salary)
+
+
+class SalaryRollup:
+    """
+    Running salary stats per (industry, location) and (language,
+    location), accumulated from a batch of cleaned rows and merged
+    into the rollup tables with a single upsert each. Each key holds
+    the count, the sum and a quantile sketch of its salaries, all of
+    which merge exactly, so applying the rollup of every inserted
+    batch gives the stats of the table. Rows are also counted towards
+    the regions and countries containing their location.
+    """
+
+    def __init__(self) -> None:
+        self._stats: dict[type, dict[tuple[str, int], SalaryStats]] = {
+            model: {} for model, _ in ROLLUPS
+        }
+
+    def add(
+        self, rows: list[dict], ancestors: Optional[dict[int, tuple[int, ...]]] = None
+    ) -> "SalaryRollup":
+        """
+        Adds the salaried rows, each counted towards its location, the
+        locations in `ancestors` containing it and all locations.
+        """
+        ancestors = ancestors or {}
+
+        for row in rows:
+            salary = row.get("salary")
+            if salary is None or salary <= 0:
+                continue
+
+            langs: set[str] = {
+                lang.lower() for lang in row.get("programming_languages") or ()
+            }
+            names: dict[type, set[str]] = {
+                IndustrySalaryStats: {row["industry"]} if row.get("industry") else set(),
+                # Aliases count towards the language charted as well, once
+                # per row however many of them it lists
+                LanguageSalaryStats: langs
+                | {LANGUAGE_ALIASES[lang] for lang in langs if lang in LANGUAGE_ALIASES},
+            }
+
+            # Rows whose location couldn't be resolved only count towards all
+            locations: tuple[int, ...] = (
+                (
+                    row["location_id"],
+                    *ancestors.get(row["location_id"], ()),
+                    ALL_LOCATIONS,
+                )
+                if row.get("location_id") is not None
+                else (ALL_LOCATIONS,)
+            )
+
+            for model, keys in names.items():
+                for name in keys:
+                    for location_id in locations:
+                        self._stats[model].setdefault(
+                            (name, location_id), SalaryStats()
+                        ).add(salary)
+
+        return self
+
+    async def apply(self, sess: AsyncSession) -> None:
+        """Merges the rollup into the rollup tables within `sess`."""
+        for model, key in ROLLUPS:
+            stats: dict[tuple[str, int], SalaryStats] = self._stats[model]
+            if not stats:
+                continue
+
+            # Keys are upserted in order so concurrent cleaners lock rows
+            # in the same order and can't deadlock
+            values: list[dict] = [
+                {
+                    key: name,
+                    "location_id": location_id,
+                    "count": s.count,
+                    "salary_sum": s.total,
+                    "sketch": s.sketch.to_dict(),
+                }
+                for (name, location_id), s in sorted(stats.items())
+            ]
+
+            for i in range(0, len(values), UPSERT_BATCH_SIZE):
+                stmt = insert(model).values(values[i : i + UPSERT_BATCH_SIZE])
+                await sess.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[key, "location_id"],
+                        set_={
+                            "count": model.count + stmt.excluded["count"],
+                            "salary_sum": model.salary_sum
+                            + stmt.excluded["salary_sum"],
+                            "sketch": func.sketch_merge(
+                                model.sketch, stmt.excluded["sketch"]
+                            ),
+                        },
+                    )
+                )
@@ -1,50 +1,114 @@
 import asyncio
 import json
 import logging
-import multiprocessing
 import warnings
 
 from contextlib import asynccontextmanager
-from httpx import AsyncClient, ReadTimeout
-from playwright.async_api import async_playwright, BrowserContext, Page, Playwright
-from random import random
-from sqlalchemy import insert
-from typing import AsyncGenerator, overload
+from httpx import AsyncClient, TransportError
+from playwright.async_api import BrowserContext, Page
+from pydantic import ValidationError
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, overload
 
-from config import CANARY_EXE_PATH, CANARY_USER_DATA_PATH, LLM_API_KEY, LLM_BASE_URL
+from config import LLM_BASE_URL
 from db_models import ScrapedData
 from engine.utils import PROGRAMMING_LANGUAGES
+from utils.bulk import bulk_insert
 from utils.db import get_db_session
+from ..browser import BrowserPool
 from ..exc import LLMError
+from ..html_compactor import compact_html
+from ..llm_cache import LLMCache
+from ..llm_client import create_llm_client
 from ..models import InitialExtractedObject, LLMExtractedObject
+from ..rate_limiter import TokenBucket
+from ..seen_index import SeenIndex
+from ..transport import BaseTransport
 
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt or the shape of its response changes
+# so previously cached extractions are no longer served.
+PROMPT_VERSION = 2
+
+# Rough number of characters per token used to size batched prompts
+CHARS_PER_TOKEN = 4
+
+ATTRIBUTES_PROMPT = f"""
+        Attributes:
+            - salary of the role. For example "$100,000 - $120,000" or "Competitive" 
+            or "Not specified" or "$500 per hour"
+            - programming languages required for the role. You must only include these languages {PROGRAMMING_LANGUAGES}.
+            If you see swiftui, put swift into the list instead
+            - responsibilities of the role as a list of strings. For example 
+            ["Designing and developing applications", "Writing clean code"]
+            - requirements of the role as a list of strings. For example 
+            ["3+ years of experience", "Strong communication skills"]
+            - extras. These are a collection of keywords that can be used to associate the job positing.
+            For example ["quantitative development", "fintech"].
+            
+        Ensure you extract the attributes and send them back to me in a JSON with keys. 
+        This is a strict response schema. I only want this JSON schema within the response. 
+
+        I'm now going to show you the only JSON schema I will accept along with their
+        associated python type.
+            - salary: str
+            - programming_languages: List[str]
+            - responsibilities: List[str]
+            - requirements: List[str]
+            - extras: List[str]
+            
+        This is a strict requirement. Failure to follow this schema will result in a failed response.
+            
+        Here's an example of the JSON schema:
+        Ensure you follow the JSON schema above.
+"""
+
 
 class BaseScraper:
+    # URL patterns let through the browser's resource filter
+    RESOURCE_ALLOW_LIST: tuple[str, ...] = ()
+
     def __init__(
         self,
         url: str,
-        clean_queue: multiprocessing.Queue,
+        transport: BaseTransport,
         *,
         sleep: float = 2.0,
         timeout: float = 5.0,
-        llm_rate_limit: int = 1,
+        llm_rps: float = 2.0,
+        llm_max_in_flight: int = 4,
+        llm_max_retries: int = 3,
+        llm_batch_size: int = 5,
+        llm_batch_token_budget: int = 8000,
+        browser: Optional[BrowserContext] = None,
     ) -> None:
         self._url = url
         self._sleep = sleep
         self._timeout = timeout
         self._queue = asyncio.Queue()
-        self._clean_queue = clean_queue
-        self._llm_rate_limit = llm_rate_limit
+        self._transport = transport
+        self._llm_limiter = TokenBucket(llm_rps, max_in_flight=llm_max_in_flight)
+        self._llm_max_retries = llm_max_retries
+        self._llm_batch_size = llm_batch_size
+        self._llm_batch_token_budget = llm_batch_token_budget
+        self._llm_tasks: set[asyncio.Task] = set()
+        self._llm_cache = LLMCache(PROMPT_VERSION)
+        self._llm_client: Optional[AsyncClient] = None
+        self._seen = SeenIndex()
         self._is_running = False
-        self._browser: BrowserContext = None
-        self._industry_page: Page = None
+        self._browser: Optional[BrowserContext] = browser
+        self._owns_browser = browser is None
+        self._pages: list[Page] = []
 
     async def run(self) -> None:
+        self._llm_client = create_llm_client()
+
+        handler: Optional[asyncio.Task] = None
+
         try:
-            asyncio.create_task(self._handle_llm())
+            await self._seen.warm()
+            handler = asyncio.create_task(self._handle_llm())
             await self._run_scraper()
         except Exception as e:
             msg = f"An error occurred casuing browser to collapse: {type(e)} {e}"
@@ -52,24 +116,45 @@ class BaseScraper:
         finally:
             while not self._queue.empty():
                 await asyncio.sleep(1)
+            if self._llm_tasks:
+                await asyncio.gather(*self._llm_tasks, return_exceptions=True)
             self._is_running = False
+            if handler is not None:
+                handler.cancel()
+            await self._llm_client.aclose()
+            await self._close_pages()
             
     @asynccontextmanager
-    async def _init_browser(self) -> AsyncGenerator[Playwright, None]:
-        await asyncio.sleep(random() * 10)  # Rate limit prevention
-        async with async_playwright() as p:
+    async def _init_browser(self) -> AsyncGenerator[None, None]:
+        if not self._owns_browser:
+            # Browser is shared and managed by the orchestrator
+            self._is_running = True
+            yield
+            return
+
+        try:
+            async with BrowserPool(max_contexts=1) as pool:
+                async with pool.context(self.RESOURCE_ALLOW_LIST) as ctx:
+                    self._browser = ctx
+                    self._is_running = True
+                    yield
+        except Exception as e:
+            msg = f"An error occurred casuing browser to collapse: {type(e)} {e}"
+            warnings.warn(msg)
+            await asyncio.sleep(10**10)
+
+    async def _new_page(self) -> Page:
+        page: Page = await self._browser.new_page()
+        self._pages.append(page)
+        return page
+
+    async def _close_pages(self) -> None:
+        for page in self._pages:
             try:
-                self._browser = await p.chromium.launch_persistent_context(
-                    user_data_dir=CANARY_USER_DATA_PATH,
-                    headless=False,
-                    executable_path=CANARY_EXE_PATH,
-                )
-                self._is_running = True
-                yield p
-            except Exception as e:
-                msg = f"An error occurred casuing browser to collapse: {type(e)} {e}"
-                warnings.warn(msg)
-                await asyncio.sleep(10**10)
+                await page.close()
+            except Exception:
+                pass
+        self._pages.clear()
 
     # Function to create page and other class specific data
     # as well as calling self._handle.
@@ -80,42 +165,25 @@ class BaseScraper:
     @overload
     async def _handle(self, page: Page) -> None: ...
 
+    def _enqueue(self, payloads: list[InitialExtractedObject]) -> None:
+        """Compacts the scraped HTML of each payload and queues them for the LLM."""
+        for payload in payloads:
+            self._seen.mark_pending(payload.url)
+            before: int = len(payload.content.encode())
+            payload.content = compact_html(payload.content)
+            after: int = len(payload.content.encode())
+            logger.info(f"Compacted {payload.url} from {before} to {after} bytes")
+
+        self._queue.put_nowait(payloads)
+
     async def _fetch_attributes(
         self, payload: InitialExtractedObject, session: AsyncClient
     ) -> dict:
-        template = f""""\
-        You're an expert JSON parser, able to extract key insights from HTML code
+        template = f"""\
+        You're an expert JSON parser, able to extract key insights from job postings
         . Your job is to extract the following insights from
         the data I've attached.
-        
-        Attributes:
-            - salary of the role. For example "$100,000 - $120,000" or "Competitive" 
-            or "Not specified" or "$500 per hour"
-            - programming languages required for the role. You must only include these languages {PROGRAMMING_LANGUAGES}.
-            If you see swiftui, put swift into the list instead
-            - responsibilities of the role as a list of strings. For example 
-            ["Designing and developing applications", "Writing clean code"]
-            - requirements of the role as a list of strings. For example 
-            ["3+ years of experience", "Strong communication skills"]
-            - extras. These are a collection of keywords that can be used to associate the job positing.
-            For example ["quantitative development", "fintech"].
-            
-        Ensure you extract the attributes and send them back to me in a JSON with keys. 
-        This is a strict response schema. I only want this JSON schema within the response. 
-
-        I'm now going to show you the only JSON schema I will accept along with their
-        associated python type.
-            - salary: str
-            - programming_languages: List[str]
-            - responsibilities: List[str]
-            - requirements: List[str]
-            - extras: List[str]
-            
-        This is a strict requirement. Failure to follow this schema will result in a failed response.
-            
-        Here's an example of the JSON schema:
-        Ensure you follow the JSON schema above.
-            
+        {ATTRIBUTES_PROMPT}
         I've attached the data for you to parse below:
         {{data}}
         
@@ -123,24 +191,66 @@ class BaseScraper:
         
         You must ensure all keys I specified are within the JSON
         """
+        rtn_value = await self._complete(
+            template.format(data=payload.content, job_title=payload.title), session
+        )
+
+        if not isinstance(rtn_value, dict):
+            raise LLMError("Expected a JSON object")
+
+        return rtn_value
+
+    async def _fetch_batch_attributes(
+        self, payloads: list[InitialExtractedObject], session: AsyncClient
+    ) -> list[dict]:
+        template = f"""\
+        You're an expert JSON parser, able to extract key insights from job postings
+        . Your job is to extract the following insights from
+        each of the job listings I've attached.
+        {ATTRIBUTES_PROMPT}
+        I've attached {{count}} job listings for you to parse below. Each one starts
+        with a line of the form "### Listing <index>: <job title>".
+        {{data}}
+        
+        Send them back to me as a JSON array containing exactly {{count}} JSON objects,
+        one for each listing and in the same order as the listings.
+        
+        You must ensure all keys I specified are within every JSON object
+        """
+        data: str = "\n\n".join(
+            f"### Listing {i}: {payload.title}\n{payload.content}"
+            for i, payload in enumerate(payloads)
+        )
+        rtn_value = await self._complete(
+            template.format(count=len(payloads), data=data), session
+        )
+
+        if not isinstance(rtn_value, list) or len(rtn_value) != len(payloads):
+            raise LLMError("Batch response doesn't match the listings sent")
+
+        return rtn_value
+
+    async def _complete(self, content: str, session: AsyncClient) -> Any:
         try:
             rsp = await session.post(
                 LLM_BASE_URL + "/agents/completions",
                 json={
                     "agent_id": "ag:a205eb03:20250326:untitled-agent:a2ed9362",
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": template.format(
-                                data=payload.content, job_title=payload.title
-                            ),
-                        }
-                    ],
+                    "messages": [{"role": "user", "content": content}],
                 },
             )
 
             if rsp.status_code != 200:
-                raise LLMError(f"Failed to fetch attributes. Status: {rsp.status_code}")
+                retry_after: Optional[str] = rsp.headers.get("retry-after")
+                raise LLMError(
+                    f"Failed to fetch attributes. Status: {rsp.status_code}",
+                    status_code=rsp.status_code,
+                    retry_after=(
+                        float(retry_after)
+                        if retry_after and retry_after.isdigit()
+                        else None
+                    ),
+                )
 
             content: str = (
                 rsp.json()["choices"][0]["message"]["content"]
@@ -148,56 +258,202 @@ class BaseScraper:
                 .replace("```", "")
             )
 
-            rtn_value: dict = json.loads(content)
-
-            return rtn_value
-        except (LLMError, json.JSONDecodeError) as e:
-            raise LLMError(("" if isinstance(e, LLMError) else f"{type(e)}") + str(e))
+            return json.loads(content)
+        # A malformed response won't improve on retrying, so these
+        # aren't retryable
+        except json.JSONDecodeError as e:
+            raise LLMError(f"{type(e)}{str(e)}")
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise LLMError(f"Malformed completion response: {type(e)}{str(e)}")
 
     async def _handle_llm(self) -> None:
-        cleaned_data: list[LLMExtractedObject] = []
-
+        """
+        Takes batches off the queue and extracts them concurrently. The
+        number of requests in flight and their rate is governed by
+        the shared limiter, so batches are free to overlap.
+        """
         while not self._is_running:
             await asyncio.sleep(1)
 
         while self._is_running:
             payloads: list[InitialExtractedObject] = await self._queue.get()
 
-            async with AsyncClient(
-                headers={"Authorization": f"Bearer {LLM_API_KEY}"}
-            ) as session:
-                for payload in payloads:
-                    try:
-                        extracted_data: dict = await self._fetch_attributes(
-                            payload, session
-                        )
-                        cleaned_data.append(
-                            LLMExtractedObject(**payload.model_dump(), **extracted_data)
-                        )
-                    except (ReadTimeout, LLMError):
-                        pass
-
-                    await asyncio.sleep(self._llm_rate_limit * (1 + random()))
-
-            logger.info("Finished processing data")
-
-            if cleaned_data:
+            task = asyncio.create_task(self._process_batch(payloads))
+            self._llm_tasks.add(task)
+            task.add_done_callback(self._llm_tasks.discard)
+
+    async def _process_batch(self, payloads: list[InitialExtractedObject]) -> None:
+        results: list[Optional[LLMExtractedObject]] = []
+        misses: list[InitialExtractedObject] = []
+
+        for payload in payloads:
+            if (extracted := await self._from_cache(payload)) is not None:
+                results.append(extracted)
+            else:
+                misses.append(payload)
+
+        chunks: list[list[InitialExtractedObject]] = self._chunk(misses)
+        chunked: list[list[Optional[LLMExtractedObject]] | BaseException] = (
+            await asyncio.gather(
+                *(self._extract_many(chunk, self._llm_client) for chunk in chunks),
+                return_exceptions=True,
+            )
+        )
+
+        # A chunk which failed outright only loses its own listings
+        for chunk, extracted in zip(chunks, chunked):
+            if isinstance(extracted, BaseException):
+                logger.error(
+                    f"Failed to extract {len(chunk)} items: "
+                    f"{type(extracted)} - {str(extracted)}"
+                )
+                results.extend([None] * len(chunk))
+            else:
+                results.extend(extracted)
+
+        logger.info(f"Finished processing data. LLM cache: {self._llm_cache.stats}")
+
+        cleaned_data: list[LLMExtractedObject] = [r for r in results if r is not None]
+        extracted: set[str] = {d.url for d in cleaned_data}
+        self._seen.release(p.url for p in payloads if p.url not in extracted)
+
+        if cleaned_data:
+            try:
                 await self._persist(cleaned_data)
-                cleaned_data.clear()
+            except Exception:
+                self._seen.release(extracted)
+                raise
+
+    def _chunk(
+        self, payloads: list[InitialExtractedObject]
+    ) -> list[list[InitialExtractedObject]]:
+        """
+        Packs payloads into chunks of at most `llm_batch_size` listings
+        whose estimated size stays within `llm_batch_token_budget`.
+        """
+        chunks: list[list[InitialExtractedObject]] = []
+        chunk: list[InitialExtractedObject] = []
+        tokens: int = 0
+
+        for payload in payloads:
+            cost: int = (len(payload.title) + len(payload.content)) // CHARS_PER_TOKEN
+
+            if chunk and (
+                len(chunk) >= self._llm_batch_size
+                or tokens + cost > self._llm_batch_token_budget
+            ):
+                chunks.append(chunk)
+                chunk, tokens = [], 0
+
+            chunk.append(payload)
+            tokens += cost
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    async def _from_cache(
+        self, payload: InitialExtractedObject
+    ) -> Optional[LLMExtractedObject]:
+        if (cached := await self._llm_cache.get(payload)) is not None:
+            try:
+                return LLMExtractedObject(**payload.model_dump(), **cached)
+            except (ValidationError, TypeError):
+                pass
+        return None
+
+    async def _extract_many(
+        self, payloads: list[InitialExtractedObject], session: AsyncClient
+    ) -> list[Optional[LLMExtractedObject]]:
+        """
+        Extracts several payloads within a single request, falling back
+        to a request per payload if the response can't be parsed or
+        any of its items fail validation.
+        """
+        if len(payloads) == 1:
+            return [await self._extract(payloads[0], session)]
+
+        extracted_data: Optional[list[dict]] = await self._call_llm(
+            self._fetch_batch_attributes, payloads, session
+        )
+
+        if extracted_data is not None:
+            try:
+                extracted: list[LLMExtractedObject] = [
+                    LLMExtractedObject(**payload.model_dump(), **data)
+                    for payload, data in zip(payloads, extracted_data)
+                ]
+            except (ValidationError, TypeError):
+                extracted = None
+
+            if extracted is not None:
+                for payload, data in zip(payloads, extracted_data):
+                    await self._llm_cache.set(payload, data)
+                return extracted
+
+        logger.info(f"Falling back to individual requests for {len(payloads)} items")
+        return await asyncio.gather(
+            *(self._extract(payload, session) for payload in payloads)
+        )
+
+    async def _extract(
+        self, payload: InitialExtractedObject, session: AsyncClient
+    ) -> Optional[LLMExtractedObject]:
+        extracted_data: Optional[dict] = await self._call_llm(
+            self._fetch_attributes, payload, session
+        )
+        if extracted_data is None:
+            return None
+
+        try:
+            extracted = LLMExtractedObject(**payload.model_dump(), **extracted_data)
+        except (ValidationError, TypeError):
+            return None
+
+        await self._llm_cache.set(payload, extracted_data)
+        return extracted
+
+    async def _call_llm(
+        self, fetch: Callable[..., Awaitable[Any]], *args: Any
+    ) -> Optional[Any]:
+        """
+        Calls `fetch` under the limiter, backing off and retrying
+        whenever the LLM API signals it's rate limited or unavailable.
+        """
+        for _ in range(self._llm_max_retries + 1):
+            async with self._llm_limiter:
+                try:
+                    rtn_value = await fetch(*args)
+                except TransportError:
+                    self._llm_limiter.backoff()
+                    continue
+                except LLMError as e:
+                    if e.is_retryable:
+                        logger.warning(f"Backing off LLM requests: {e.message}")
+                        self._llm_limiter.backoff(e.retry_after)
+                        continue
+                    return None
+
+            self._llm_limiter.recover()
+            return rtn_value
+
+        logger.warning("Giving up on LLM request after retries")
+        return None
 
     async def _persist(self, data: list[LLMExtractedObject]) -> None:
         logger.info("Inserting scraped data into database")
+        dumped: list[dict] = [d.model_dump() for d in data]
+
         async with get_db_session() as sess:
-            await sess.execute(
-                insert(ScrapedData).values(
-                    [d.model_dump() for d in data]
-                )
-            )
+            await bulk_insert(sess, ScrapedData.__table__, dumped)
             await sess.commit()
 
-        print(f"Pushing {len(data)} items to clean queue")
-        self._clean_queue.put_nowait(data.copy())
         logger.info("Scraped data ata inserted into database")
+        print(f"Pushing {len(data)} items to clean queue")
+        await self._transport.publish(dumped)
+
+        await self._seen.add(d.url for d in data)
 
     @property
     def url(self) -> str:
@@ -1,35 +1,76 @@
 import asyncio
+import json
+import re
 
-from multiprocessing import Queue
-from playwright.async_api import ElementHandle, Page, TimeoutError
+from playwright.async_api import BrowserContext, Page, TimeoutError
+from typing import Optional
+from urllib.parse import unquote
 
 from engine.exc import ScrapingError
 
 from .base_scraper import BaseScraper
 from ..models import InitialExtractedObject
+from ..transport import BaseTransport
 
 
+CARD_SELECTOR = "a.MQUd2b"
+PANE_SELECTOR = "div#Sva75c div.NgUYpe"
+
+# Resolves once the job pane shows the card which was clicked, recognised
+# by its docid as consecutive postings often share a title
+PANE_SHOWS_SCRIPT = """
+docids => {
+    const html = document.querySelector("div#Sva75c div.NgUYpe")?.innerHTML ?? "";
+    return docids.some(docid => html.includes(docid));
+}
+"""
+
+DOCID_PATTERN = re.compile(r"[?&#]htidocid=([^&#]+)")
+
+# Time in milliseconds to wait for the job pane to show a clicked card
+PANE_TIMEOUT = 10_000
+
+CARD_FIELDS_SCRIPT = """
+cards => cards.map(card => ({
+    href: card.getAttribute("href"),
+    title: card.querySelector("div.tNxQIb.PUpOsf")?.textContent ?? null,
+    company: card.querySelector("div.wHYlTd.MKCbgd.a3jPc")?.textContent ?? null,
+    location: card.querySelector("div.wHYlTd.FqK3wc.MKCbgd")?.textContent ?? null,
+    height: card.getBoundingClientRect().height,
+}))
+"""
+
 class GoogleJobsScraper(BaseScraper):
     def __init__(
         self,
         url: str,
-        clean_queue: Queue,
+        transport: BaseTransport,
         *,
         sleep: float = 0.5,
         timeout: float = 1.0,
-        llm_rate_limit: int = 1,
+        llm_rps: float = 2.0,
+        llm_max_in_flight: int = 4,
+        llm_max_retries: int = 3,
+        llm_batch_size: int = 5,
+        llm_batch_token_budget: int = 8000,
+        browser: Optional[BrowserContext] = None,
     ) -> None:
         super().__init__(
             url,
-            clean_queue,
+            transport,
             sleep=sleep,
             timeout=timeout,
-            llm_rate_limit=llm_rate_limit,
+            llm_rps=llm_rps,
+            llm_max_in_flight=llm_max_in_flight,
+            llm_max_retries=llm_max_retries,
+            llm_batch_size=llm_batch_size,
+            llm_batch_token_budget=llm_batch_token_budget,
+            browser=browser,
         )
 
     async def _run_scraper(self) -> None:
         async with self._init_browser():
-            page = await self._browser.new_page()
+            page = await self._new_page()
             print("Pages initialised")
 
             print("Heading to URL")
@@ -49,54 +90,81 @@ class GoogleJobsScraper(BaseScraper):
         strike: int = 0
 
         while strike < 3:
-            cards: list[ElementHandle] = await self._locate_cards(page)
+            cards: list[dict] = await self._locate_cards(page)
 
             if not cards:
                 print("No cards found")
                 break
 
             to_queue: list[InitialExtractedObject] = []
+            scroll_height: float = 0
 
             for card in cards:
-                if (href := await card.get_attribute("href")) not in prev_cards:
-                    try:
+                if card["href"] in prev_cards:
+                    continue
+
+                prev_cards.add(card["href"])
+                scroll_height += card["height"]
+
+                try:
+                    # Filtered before the seen check, which costs a round trip
+                    self._check_card(card)
+                    if not await self._seen.contains(card["href"]):
                         to_queue.append(await self._scrape_card(card, page))
-                        await asyncio.sleep(self._sleep)
-                    except ScrapingError:
-                        pass
-                    finally:
-                        prev_cards.add(href)
-                        await page.locator("div#center_col").hover()
-                        await page.mouse.wheel(0, (await card.bounding_box())["height"])
+                except ScrapingError:
+                    pass
+
+            if scroll_height:
+                await page.locator("div#center_col").hover()
+                await page.mouse.wheel(0, scroll_height)
 
             if to_queue:
-                self._queue.put_nowait(to_queue)
+                self._enqueue(to_queue)
             else:
                 strike += 1
 
             await asyncio.sleep(self._timeout)
 
-    async def _locate_cards(self, page: Page) -> list[ElementHandle]:
-        return await page.query_selector_all("a.MQUd2b")
+    async def _locate_cards(self, page: Page) -> list[dict]:
+        """Reads the fields of every card on the page in a single round trip."""
+        return await page.eval_on_selector_all(CARD_SELECTOR, CARD_FIELDS_SCRIPT)
 
-    async def _scrape_card(
-        self, card: ElementHandle, page: Page
-    ) -> InitialExtractedObject:
-        location: str = await (
-            await card.query_selector("div.wHYlTd.FqK3wc.MKCbgd")
-        ).text_content()
+    @staticmethod
+    def _check_card(card: dict) -> None:
+        if None in (card["href"], card["title"], card["company"], card["location"]):
+            raise ScrapingError("Card is missing fields")
 
-        if "london" not in location.lower():
+        if "london" not in card["location"].lower():
             raise ScrapingError("Location not in London")
 
-        await card.click()
+    @staticmethod
+    def _docids(href: str) -> list[str]:
+        """
+        The htidocid of a card's href, both as given and unquoted as
+        the pane may carry either, or the href itself if it has none.
+        """
+        matched = DOCID_PATTERN.search(href)
+        if matched is None:
+            return [href]
+        return list(dict.fromkeys((matched.group(1), unquote(matched.group(1)))))
+
+    async def _scrape_card(self, card: dict, page: Page) -> InitialExtractedObject:
+        # Located by href as the list can change between reading and clicking
+        await page.locator(f"{CARD_SELECTOR}[href={json.dumps(card['href'])}]").click()
+
+        try:
+            await page.wait_for_function(
+                PANE_SHOWS_SCRIPT,
+                arg=self._docids(card["href"]),
+                timeout=PANE_TIMEOUT,
+            )
+        except TimeoutError:
+            raise ScrapingError(f"Job pane didn't show {card['href']}")
 
         return InitialExtractedObject(
-            url=await card.get_attribute("href"),
-            title=await (await card.query_selector("div.tNxQIb.PUpOsf")).text_content(),
-            company=await (
-                await card.query_selector("div.wHYlTd.MKCbgd.a3jPc")
-            ).text_content(),
-            location=location,
-            content=await page.locator("div#Sva75c div.NgUYpe").nth(0).inner_html(),
+            url=card["href"],
+            title=card["title"],
+            company=card["company"],
+            location=card["location"],
+            content=await page.locator(PANE_SELECTOR).nth(0).inner_html(),
         )
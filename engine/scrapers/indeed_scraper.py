@@ -1,28 +1,40 @@
 import asyncio
-import multiprocessing
+from playwright.async_api import BrowserContext
+from typing import Optional
 from .base_scraper import BaseScraper
+from ..transport import BaseTransport
 
 
 class IndeedScraper(BaseScraper):
     def __init__(
         self,
         url: str,
-        clean_queue: multiprocessing.Queue,
+        transport: BaseTransport,
         *,
         sleep: float = 2,
         timeout: float = 5,
-        llm_rate_limit: int = 1
+        llm_rps: float = 2.0,
+        llm_max_in_flight: int = 4,
+        llm_max_retries: int = 3,
+        llm_batch_size: int = 5,
+        llm_batch_token_budget: int = 8000,
+        browser: Optional[BrowserContext] = None,
     ) -> None:
         super().__init__(
             url,
-            clean_queue,
+            transport,
             sleep=sleep,
             timeout=timeout,
-            llm_rate_limit=llm_rate_limit,
+            llm_rps=llm_rps,
+            llm_max_in_flight=llm_max_in_flight,
+            llm_max_retries=llm_max_retries,
+            llm_batch_size=llm_batch_size,
+            llm_batch_token_budget=llm_batch_token_budget,
+            browser=browser,
         )
 
     async def _run_scraper(self) -> None:
         async with self._init_browser():
-            page = await self._browser.new_page()
+            page = await self._new_page()
             await page.goto(self._url)
             await asyncio.sleep(10**3)
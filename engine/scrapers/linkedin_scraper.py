@@ -1,15 +1,19 @@
 import asyncio
 import logging
-import multiprocessing
 import warnings
 
-from playwright.async_api import Page, Locator, TimeoutError
+from playwright.async_api import BrowserContext, Page, Locator, TimeoutError
+from typing import Optional
 from .base_scraper import BaseScraper
 from ..exc import ScrapingError
+from ..industry_cache import IndustryCache
 from ..models import InitialExtractedObject
+from ..transport import BaseTransport
 
 logger = logging.getLogger(__name__)
 
+JOB_URL = "https://www.linkedin.com/jobs/view/{job_id}/"
+
 
 class LinkedInScraper(BaseScraper):
     """
@@ -17,35 +21,55 @@ class LinkedInScraper(BaseScraper):
 
     Attributes:
         url (str): The URL to scrape.
-        clean_queue (multiprocessing.Queue): The queue used to transport data to the cleaner.
+        transport (BaseTransport): The transport used to send data to the cleaner.
         sleep (int): The time to sleep between scraping individual cards.
         timeout (int): The time to wait before going to the next page.
         queue (asyncio.Queue): The queue used to transport data to the LLM handler.
-        llm_rate_limit (int): The rate limit in seconds for LLM API requests.
+        llm_rps (float): The maximum number of LLM API requests per second.
+        llm_max_in_flight (int): The maximum number of concurrent LLM API requests.
+        llm_max_retries (int): The number of retries on rate limited or failed LLM API requests.
+        llm_batch_size (int): The maximum number of listings sent in a single LLM API request.
+        llm_batch_token_budget (int): The maximum estimated tokens of listings in a single LLM API request.
+        browser (BrowserContext): A shared browser context, launches its own if not provided.
+        industry_pages (int): The number of pages used to resolve company industries in the background.
     """
 
     def __init__(
         self,
         url: str,
-        clean_queue: multiprocessing.Queue,
+        transport: BaseTransport,
         *,
         sleep: float = 2.0,
         timeout: float = 5.0,
-        llm_rate_limit: int = 1,
+        llm_rps: float = 2.0,
+        llm_max_in_flight: int = 4,
+        llm_max_retries: int = 3,
+        llm_batch_size: int = 5,
+        llm_batch_token_budget: int = 8000,
+        browser: Optional[BrowserContext] = None,
+        industry_pages: int = 2,
     ) -> None:
         super().__init__(
             url,
-            clean_queue,
+            transport,
             sleep=sleep,
             timeout=timeout,
-            llm_rate_limit=llm_rate_limit,
+            llm_rps=llm_rps,
+            llm_max_in_flight=llm_max_in_flight,
+            llm_max_retries=llm_max_retries,
+            llm_batch_size=llm_batch_size,
+            llm_batch_token_budget=llm_batch_token_budget,
+            browser=browser,
         )
-        self._industry_page: Page = None
+        self._industry_page_count = industry_pages
+        self._industry_pages: asyncio.Queue[Page] = asyncio.Queue()
+        self._industries = IndustryCache(self._fetch_industry)
 
     async def _run_scraper(self) -> None:
         async with self._init_browser():
-            page = await self._browser.new_page()
-            self._industry_page = await self._browser.new_page()
+            page = await self._new_page()
+            for _ in range(self._industry_page_count):
+                self._industry_pages.put_nowait(await self._new_page())
             logger.info("Pages initialised")
 
             logger.info("Heading to URL")
@@ -79,11 +103,18 @@ class LinkedInScraper(BaseScraper):
         logger.info("Beginning scrape on individual cards")
 
         data: list[InitialExtractedObject] = []
+        industries: list[tuple[InitialExtractedObject, asyncio.Task]] = []
 
         for card in cards:
             try:
-                data.append(await self._scrape_card(page, card))
-                await asyncio.sleep(self._sleep)
+                url: str = await self._job_url(card)
+
+                if not await self._seen.contains(url):
+                    payload, industry = await self._scrape_card(page, card, url)
+                    data.append(payload)
+                    if industry is not None:
+                        industries.append((payload, industry))
+                    await asyncio.sleep(self._sleep)
 
                 if dimensions := await card.bounding_box():
                     await page.mouse.wheel(0, dimensions["height"])
@@ -91,8 +122,18 @@ class LinkedInScraper(BaseScraper):
                 m = f"Error whilst scraping: {str(e)}"
                 warnings.warn(m)
 
+        # Industries have been resolving in the background whilst scraping
+        for (payload, _), industry in zip(
+            industries,
+            await asyncio.gather(
+                *(task for _, task in industries), return_exceptions=True
+            ),
+        ):
+            if isinstance(industry, str):
+                payload.industry = industry
+
         if data:
-            self._queue.put_nowait(data)
+            self._enqueue(data)
 
         return True
 
@@ -101,42 +142,60 @@ class LinkedInScraper(BaseScraper):
         logger.info(f"Found {len(cards)} cards")
         return cards
 
+    async def _job_url(self, card: Locator) -> str:
+        # The page URL carries the search parameters, so the job ID
+        # is used to build a stable URL for the posting instead.
+        job_id: str = await card.get_attribute("data-occludable-job-id")
+        return JOB_URL.format(job_id=job_id)
+
     async def _scrape_card(
-        self, page: Page, card: Locator
-    ) -> InitialExtractedObject:
+        self, page: Page, card: Locator, url: str
+    ) -> tuple[InitialExtractedObject, Optional[asyncio.Task]]:
+        """
+        Scrapes the card, returning it alongside a task resolving
+        the industry of its company, None if the card doesn't link to
+        the company.
+        """
         await card.click()
 
         try:
+            company_url: Optional[str] = await page.locator(
+                ".job-details-jobs-unified-top-card__company-name a"
+            ).get_attribute("href")
+
             return InitialExtractedObject(
-                url=page.url,
+                url=url,
                 title=await page.locator(
                     ".t-24.job-details-jobs-unified-top-card__job-title a"
                 ).text_content(),
                 company=await page.locator(
                     ".job-details-jobs-unified-top-card__company-name a"
                 ).text_content(),
-                industry=await self._fetch_industry(page),
                 location=await (
                     await page.locator(
                         ".t-black--light.mt2.job-details-jobs-unified-top-card__tertiary-description-container span"
                     ).all()
                 )[0].text_content(),
                 content=await page.locator("div.jobs-box__html-content").inner_html(),
+            ), (
+                self._industries.resolve(company_url)
+                if company_url is not None
+                else None
             )
         except (TimeoutError, IndexError) as e:
             raise ScrapingError(str(e))
 
-    async def _fetch_industry(self, cur_page: Page) -> str:
-        url: str = await cur_page.locator(
-            ".job-details-jobs-unified-top-card__company-name a"
-        ).get_attribute("href")
-        
-        await self._industry_page.goto(url)
-        
-        industry: str = await (
-            await self._industry_page.locator(
-                ".org-top-card-summary-info-list div"
-            ).all()
-        )[0].text_content()
-        
-        return industry
+    async def _fetch_industry(self, company_url: str) -> Optional[str]:
+        page: Page = await self._industry_pages.get()
+
+        try:
+            await page.goto(company_url)
+
+            return await (
+                await page.locator(".org-top-card-summary-info-list div").all()
+            )[0].text_content()
+        except (TimeoutError, IndexError) as e:
+            logger.warning(f"Failed to fetch industry for {company_url}: {e}")
+            return None
+        finally:
+            self._industry_pages.put_nowait(page)
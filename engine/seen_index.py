@@ -0,0 +1,127 @@
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from typing import Iterable, Optional
+
+from config import REDIS_CLIENT, SEEN_URLS_KEY, SEEN_URLS_RESYNC_INTERVAL
+from db_models import CleanedDataUrl
+from utils.db import get_db_session
+
+
+logger = logging.getLogger(__name__)
+
+
+class SeenIndex:
+    """
+    Index of posting URLs which have already been scraped, shared
+    between scrapers through a Redis set. Lookups happen before a
+    card is clicked so known postings cost neither browser time nor
+    LLM calls. URLs are only added to the shared set once they've
+    been persisted, queued URLs are tracked locally until then and
+    released if their extraction fails so they can be retried.
+
+    The set is re-synced from cleaned_data_urls once the last sync is
+    `resync_interval` seconds old, picking up URLs whose addition to
+    the set failed or which were lost from Redis.
+
+    Attributes:
+        redis (Redis): The Redis client holding the set.
+        key (str): The key of the set.
+        chunk_size (int): The number of URLs added per round trip whilst warming.
+        resync_interval (int): The time in seconds between syncs from cleaned_data_urls.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Redis = REDIS_CLIENT,
+        key: str = SEEN_URLS_KEY,
+        chunk_size: int = 5000,
+        resync_interval: int = SEEN_URLS_RESYNC_INTERVAL,
+    ) -> None:
+        self._redis = redis
+        self._key = key
+        self._synced_at_key = f"{key}:synced_at"
+        self._chunk_size = chunk_size
+        self._resync_interval = resync_interval
+        self._pending: set[str] = set()
+
+    async def warm(self) -> None:
+        """
+        Populates the set from cleaned_data_urls if it has never been
+        synced or the last sync is older than `resync_interval`.
+        """
+        started_at: float = time.time()
+
+        try:
+            synced_at = await self._redis.get(self._synced_at_key)
+        except RedisError as e:
+            logger.warning(f"Failed to check seen index: {e}")
+            return
+
+        if (
+            synced_at is not None
+            and started_at - float(synced_at) < self._resync_interval
+        ):
+            return
+
+        logger.info("Syncing seen index from cleaned_data_urls")
+        count = 0
+        chunk: list[str] = []
+
+        async with get_db_session() as sess:
+            res = await sess.stream_scalars(select(CleanedDataUrl.url))
+
+            async for url in res:
+                chunk.append(url)
+                if len(chunk) >= self._chunk_size:
+                    count += await self._add(chunk)
+                    chunk.clear()
+
+        if chunk:
+            count += await self._add(chunk)
+
+        # Urls persisted whilst syncing are added as they're persisted
+        try:
+            await self._redis.set(self._synced_at_key, started_at)
+        except RedisError as e:
+            logger.warning(f"Failed to record seen index sync: {e}")
+
+        logger.info(f"Seen index synced, {count} urls added")
+
+    async def contains(self, url: Optional[str]) -> bool:
+        if not url:
+            return False
+        if url in self._pending:
+            return True
+
+        try:
+            return bool(await self._redis.sismember(self._key, url))
+        except RedisError as e:
+            logger.warning(f"Seen index lookup failed: {e}")
+            return False
+
+    def mark_pending(self, url: str) -> None:
+        self._pending.add(url)
+
+    def release(self, urls: Iterable[str]) -> None:
+        """Forgets queued URLs whose extraction failed, so they're scraped again."""
+        self._pending.difference_update(urls)
+
+    async def add(self, urls: Iterable[str]) -> None:
+        urls = list(urls)
+        await self._add(urls)
+        self._pending.difference_update(urls)
+
+    async def _add(self, urls: list[str]) -> int:
+        if not urls:
+            return 0
+
+        try:
+            return await self._redis.sadd(self._key, *urls)
+        except RedisError as e:
+            logger.warning(f"Failed to add to seen index: {e}")
+            return 0
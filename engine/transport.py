@@ -0,0 +1,313 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+
+from abc import ABC, abstractmethod
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from typing import Optional
+
+from config import (
+    CHART_GROUP,
+    CLEANED_DATA_STREAM,
+    CLEANER_GROUP,
+    REDIS_CLIENT,
+    SCRAPED_DATA_STREAM,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# A batch of scraped rows alongside the ID it's acknowledged with
+Entry = tuple[str, list[dict]]
+
+# A batch of cleaned rows alongside its entry ID and batch ID
+Batch = tuple[str, str, list[dict]]
+
+
+def _text(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def entry_timestamp(entry_id: str) -> float:
+    """The time an entry was published, IDs take the form <ms>-<seq>."""
+    return int(entry_id.split("-", 1)[0]) / 1000
+
+
+class BaseTransport(ABC):
+    """
+    Carries batches of scraped rows from the scrapers to the cleaners.
+    Entries handed out by `read` are redelivered until acknowledged.
+    """
+
+    @abstractmethod
+    async def publish(self, data: list[dict]) -> None: ...
+
+    @abstractmethod
+    async def read(self, count: int = 10, block: int = 1000) -> list[Entry]:
+        """Reads up to `count` entries, waiting up to `block` milliseconds."""
+
+    @abstractmethod
+    async def ack(self, ids: list[str]) -> None: ...
+
+
+class RedisStreamTransport(BaseTransport):
+    """
+    Transport backed by a Redis stream read through a consumer group,
+    so any number of cleaners on any node can share the load. Entries
+    left pending by a consumer which died are reclaimed by the others
+    once they've been idle for `claim_idle` milliseconds.
+
+    An entry which has been delivered `max_deliveries` times without
+    being acknowledged, most likely because it kills whichever consumer
+    reads it, is moved to the dead letter stream rather than reclaimed
+    again.
+
+    Attributes:
+        stream (str): The key of the stream.
+        group (str): The consumer group cleaners read through.
+        consumer (str): The name of this consumer within the group.
+        redis (Redis): The Redis client.
+        maxlen (int): The approximate number of entries the stream is trimmed to.
+        claim_idle (int): The time in milliseconds before a pending entry is reclaimed.
+        start_id (str): Where the group starts reading if it doesn't exist yet.
+        max_deliveries (int): The number of deliveries before an entry is dead lettered.
+        dead_letter_stream (str | None): Where dead lettered entries go, `stream`:dead if None.
+    """
+
+    def __init__(
+        self,
+        *,
+        stream: str = SCRAPED_DATA_STREAM,
+        group: str = CLEANER_GROUP,
+        consumer: Optional[str] = None,
+        redis: Redis = REDIS_CLIENT,
+        maxlen: int = 100_000,
+        claim_idle: int = 60_000,
+        start_id: str = "0",
+        max_deliveries: int = 5,
+        dead_letter_stream: Optional[str] = None,
+    ) -> None:
+        self._stream = stream
+        self._group = group
+        self._consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._redis = redis
+        self._maxlen = maxlen
+        self._claim_idle = claim_idle
+        self._start_id = start_id
+        self._max_deliveries = max_deliveries
+        self._dead_letter_stream = dead_letter_stream or f"{stream}:dead"
+        self._has_group = False
+
+    async def publish(self, data: list[dict]) -> None:
+        await self._redis.xadd(
+            self._stream,
+            {"data": json.dumps(data)},
+            maxlen=self._maxlen,
+            approximate=True,
+        )
+
+    async def read(self, count: int = 10, block: int = 1000) -> list[Entry]:
+        await self._ensure_group()
+
+        # Entries abandoned by dead consumers take priority
+        _, claimed, *_ = await self._redis.xautoclaim(
+            self._stream,
+            self._group,
+            self._consumer,
+            min_idle_time=self._claim_idle,
+            start_id="0-0",
+            count=count,
+        )
+        if claimed:
+            logger.info(f"Reclaimed {len(claimed)} pending entries")
+            claimed = await self._dead_letter(claimed)
+            return self._decode(claimed)
+
+        res = await self._redis.xreadgroup(
+            self._group,
+            self._consumer,
+            {self._stream: ">"},
+            count=count,
+            block=block,
+        )
+        return self._decode(res[0][1]) if res else []
+
+    async def ack(self, ids: list[str]) -> None:
+        if ids:
+            await self._redis.xack(self._stream, self._group, *ids)
+
+    async def _dead_letter(self, entries: list[tuple[bytes, dict]]) -> list[tuple]:
+        """
+        Moves entries which have already been delivered `max_deliveries`
+        times to the dead letter stream and acknowledges them, returning
+        the rest.
+        """
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for entry_id, _ in entries:
+                pipe.xpending_range(
+                    self._stream, self._group, min=entry_id, max=entry_id, count=1
+                )
+            pending: list[list[dict]] = await pipe.execute()
+
+        rtn_value: list[tuple] = []
+        for (entry_id, fields), found in zip(entries, pending):
+            # Claiming counts as a delivery, so this one is past the limit
+            deliveries: int = found[0]["times_delivered"] if found else 0
+            if not fields or deliveries <= self._max_deliveries:
+                rtn_value.append((entry_id, fields))
+                continue
+
+            logger.error(
+                f"Dead lettering {_text(entry_id)} after {deliveries - 1} deliveries"
+            )
+            await self._redis.xadd(
+                self._dead_letter_stream,
+                {**fields, "entry_id": entry_id, "group": self._group},
+                maxlen=self._maxlen,
+                approximate=True,
+            )
+            await self._redis.xack(self._stream, self._group, entry_id)
+
+        return rtn_value
+
+    async def _ensure_group(self) -> None:
+        if self._has_group:
+            return
+
+        try:
+            await self._redis.xgroup_create(
+                self._stream, self._group, id=self._start_id, mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._has_group = True
+
+    @staticmethod
+    def _decode(entries: list[tuple[bytes, dict]]) -> list[Entry]:
+        # Entries deleted whilst pending come back without fields
+        return [
+            (
+                entry_id.decode() if isinstance(entry_id, bytes) else entry_id,
+                json.loads(fields.get(b"data") or fields.get("data")),
+            )
+            for entry_id, fields in entries
+            if fields
+        ]
+
+
+class CleanedDataLog(RedisStreamTransport):
+    """
+    Durable log of the cleaned rows inserted into cleaned_data, read
+    by the chart generator. Each entry carries the ID of the batch it
+    came from, entries replayed after a crash carry the same ID so
+    consumers can recognise batches they've already applied.
+    """
+
+    def __init__(
+        self,
+        *,
+        stream: str = CLEANED_DATA_STREAM,
+        group: str = CHART_GROUP,
+        **kwargs,
+    ) -> None:
+        super().__init__(stream=stream, group=group, **kwargs)
+
+    async def publish(self, data: list[dict], batch_id: Optional[str] = None) -> str:
+        """Publishes a batch of rows, returning its batch ID."""
+        batch_id = batch_id or uuid.uuid4().hex
+        await self._redis.xadd(
+            self._stream,
+            {"batch_id": batch_id, "data": json.dumps(data)},
+            maxlen=self._maxlen,
+            approximate=True,
+        )
+        return batch_id
+
+    async def read(self, count: int = 10, block: int = 1000) -> list[Batch]:
+        return await super().read(count, block)
+
+    async def last_id(self) -> str:
+        """The ID of the latest entry in the stream, "0-0" if it's empty."""
+        await self._ensure_group()
+        info: dict = await self._redis.xinfo_stream(self._stream)
+        last_id = info.get("last-generated-id") or info.get(b"last-generated-id")
+        return last_id.decode() if isinstance(last_id, bytes) else last_id or "0-0"
+
+    async def skip_to(self, entry_id: str) -> None:
+        """Moves the group past every entry up to and including `entry_id`."""
+        await self._ensure_group()
+        await self._redis.xgroup_setid(self._stream, self._group, entry_id)
+
+    @staticmethod
+    def _decode(entries: list[tuple[bytes, dict]]) -> list[Batch]:
+        rtn_value: list[Batch] = []
+
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+
+            fields = {
+                (k.decode() if isinstance(k, bytes) else k): (
+                    v.decode() if isinstance(v, bytes) else v
+                )
+                for k, v in fields.items()
+            }
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            rtn_value.append(
+                (entry_id, fields.get("batch_id") or entry_id, json.loads(fields["data"]))
+            )
+
+        return rtn_value
+
+
+class LocalTransport(BaseTransport):
+    """
+    In-process transport for single process runs. Entries which
+    haven't been acknowledged are redelivered on `redeliver`.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[Entry] = asyncio.Queue()
+        self._pending: dict[str, list[dict]] = {}
+        self._ids = itertools.count()
+
+    async def publish(self, data: list[dict]) -> None:
+        entry_id = f"{int(time.time() * 1000)}-{next(self._ids)}"
+        self._queue.put_nowait((entry_id, data))
+
+    async def read(self, count: int = 10, block: int = 1000) -> list[Entry]:
+        entries: list[Entry] = []
+
+        try:
+            entries.append(
+                await asyncio.wait_for(self._queue.get(), timeout=block / 1000)
+            )
+        except asyncio.TimeoutError:
+            return entries
+
+        while len(entries) < count and not self._queue.empty():
+            entries.append(self._queue.get_nowait())
+
+        self._pending.update(entries)
+        return entries
+
+    async def ack(self, ids: list[str]) -> None:
+        for entry_id in ids:
+            self._pending.pop(entry_id, None)
+
+    def redeliver(self) -> None:
+        for entry in self._pending.items():
+            self._queue.put_nowait(entry)
+        self._pending.clear()
+
+    @property
+    def pending(self) -> dict[str, list[dict]]:
+        return self._pending
@@ -0,0 +1,312 @@
+import logging
+import re
+
+from datetime import datetime, timedelta
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from typing import Optional
+
+from config import REDIS_CLIENT, TRENDS_KEY_PREFIX
+from db_models import TrendBucket
+from utils.db import get_db_session
+from .utils import decode_counts, merge_aliases
+
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES: dict[str, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Number of the most recent buckets held in Redis, older ones are read
+# from trend_buckets
+RING_SIZES: dict[str, int] = {"hour": 24 * 7, "day": 90}
+
+DIMENSIONS: tuple[str, ...] = ("plang", "industry")
+
+WINDOW_PATTERN = re.compile(r"(\d+)([hdw])")
+WINDOW_UNITS: dict[str, timedelta] = {
+    "h": timedelta(hours=1),
+    "d": timedelta(days=1),
+    "w": timedelta(weeks=1),
+}
+MAX_WINDOW = timedelta(days=365)
+MAX_BUCKETS = 1000
+
+ROLLUP_QUERIES: dict[str, str] = {
+    "plang": """
+        SELECT date_trunc(:granularity, created_at) AS bucket_start,
+               lower(lang) AS name,
+               count(*) AS count
+        FROM cleaned_data
+        CROSS JOIN LATERAL unnest(programming_languages) AS lang
+        WHERE created_at >= :since
+        GROUP BY 1, 2
+    """,
+    "industry": """
+        SELECT date_trunc(:granularity, created_at) AS bucket_start,
+               coalesce(industry, 'null') AS name,
+               count(*) AS count
+        FROM cleaned_data
+        WHERE created_at >= :since
+        GROUP BY 1, 2
+    """,
+}
+
+
+def parse_window(window: str) -> timedelta:
+    """Parses windows such as "24h", "7d" or "4w"."""
+    matched = WINDOW_PATTERN.fullmatch(window.strip().lower())
+    if matched is None:
+        raise ValueError(f"Invalid window {window}")
+
+    value = int(matched.group(1)) * WINDOW_UNITS[matched.group(2)]
+    if not timedelta(0) < value <= MAX_WINDOW:
+        raise ValueError(f"Window must be between 1h and {MAX_WINDOW.days}d")
+    return value
+
+
+def truncate(value: datetime, granularity: str) -> datetime:
+    """The start of the bucket `value` falls in, matches date_trunc."""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        value = value.replace(hour=0)
+    return value
+
+
+def count_names(data: list[dict]) -> dict[str, dict[str, int]]:
+    """Counts the languages and industries of a batch of cleaned rows."""
+    counts: dict[str, dict[str, int]] = {dimension: {} for dimension in DIMENSIONS}
+
+    for d in data:
+        for lang in d["programming_languages"]:
+            lang = lang.lower()
+            counts["plang"][lang] = counts["plang"].get(lang, 0) + 1
+
+        ind: str = d["industry"] if d["industry"] is not None else "null"
+        counts["industry"][ind] = counts["industry"].get(ind, 0) + 1
+
+    # Normalised as the bar charts are
+    merge_aliases(counts["plang"])
+    return counts
+
+
+class TrendBuckets:
+    """
+    Per hour and per day counts of languages and industries. The most
+    recent buckets of each granularity live in Redis as hashes which
+    expire once they fall out of the ring, and are incremented as
+    batches are applied while open. Every bucket is also rolled up
+    from cleaned_data into trend_buckets, which serves buckets older
+    than the ring, and overwrites the ring once closed.
+
+    Attributes:
+        redis (Redis): The Redis client holding the ring.
+        grace (timedelta): How long after a bucket ends before it's treated as closed.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Redis = REDIS_CLIENT,
+        grace: timedelta = timedelta(minutes=5),
+    ) -> None:
+        self._redis = redis
+        self._grace = grace
+
+    @staticmethod
+    def _key(dimension: str, granularity: str, start: datetime) -> str:
+        return f"{TRENDS_KEY_PREFIX}:{dimension}:{granularity}:{start:%Y%m%dT%H}"
+
+    @staticmethod
+    def _expires_at(granularity: str, start: datetime) -> datetime:
+        return start + GRANULARITIES[granularity] * (RING_SIZES[granularity] + 1)
+
+    def _closed(self, granularity: str, start: datetime, now: datetime) -> bool:
+        return start + GRANULARITIES[granularity] <= now - self._grace
+
+    def increment(self, pipe: Pipeline, data: list[dict], at: datetime) -> None:
+        """
+        Queues the increments for a batch of rows onto `pipe`, each
+        counted into the buckets its created_at falls in as the roll up
+        counts it. Rows published before they carried created_at are
+        counted at `at`. Closed buckets are left to the roll up, which
+        already counts or will count these rows.
+        """
+        now: datetime = datetime.now()
+
+        for granularity in GRANULARITIES:
+            batches: dict[datetime, list[dict]] = {}
+            for d in data:
+                created_at: datetime = (
+                    datetime.fromisoformat(d["created_at"]) if "created_at" in d else at
+                )
+                batches.setdefault(truncate(created_at, granularity), []).append(d)
+
+            for start, rows in batches.items():
+                if self._closed(granularity, start, now):
+                    continue
+
+                for dimension, named in count_names(rows).items():
+                    if not named:
+                        continue
+
+                    key: str = self._key(dimension, granularity, start)
+                    for name, value in named.items():
+                        pipe.hincrby(key, name, value)
+                    pipe.expireat(key, self._expires_at(granularity, start))
+
+    async def roll_up(self) -> None:
+        """
+        Recomputes the buckets which may have changed since the last
+        roll up into trend_buckets, and writes those which have closed
+        over the ring. The first roll up covers the whole table.
+        """
+        now: datetime = datetime.now()
+
+        for granularity in GRANULARITIES:
+            watermark_key = f"{TRENDS_KEY_PREFIX}:watermark:{granularity}"
+            watermark: Optional[bytes | str] = await self._redis.get(watermark_key)
+            since: datetime = (
+                datetime.fromisoformat(
+                    watermark.decode() if isinstance(watermark, bytes) else watermark
+                )
+                if watermark is not None
+                else datetime.min
+            )
+
+            rows: list[dict] = []
+            async with get_db_session() as sess:
+                for dimension, query in ROLLUP_QUERIES.items():
+                    res = await sess.execute(
+                        text(query), {"granularity": granularity, "since": since}
+                    )
+                    buckets: dict[datetime, dict[str, int]] = {}
+                    for start, name, count in res.all():
+                        buckets.setdefault(start, {})[name] = count
+
+                    for start, counts in buckets.items():
+                        if dimension == "plang":
+                            merge_aliases(counts)
+                        rows.extend(
+                            {
+                                "dimension": dimension,
+                                "granularity": granularity,
+                                "bucket_start": start,
+                                "name": name,
+                                "count": count,
+                            }
+                            for name, count in counts.items()
+                        )
+
+                for i in range(0, len(rows), 5000):
+                    stmt = insert(TrendBucket).values(rows[i : i + 5000])
+                    await sess.execute(
+                        stmt.on_conflict_do_update(
+                            index_elements=[
+                                "dimension",
+                                "granularity",
+                                "bucket_start",
+                                "name",
+                            ],
+                            set_={"count": stmt.excluded["count"]},
+                        )
+                    )
+                await sess.commit()
+
+            await self._fill_ring(granularity, rows, now)
+
+            # Buckets from here on may still receive rows
+            await self._redis.set(
+                watermark_key, truncate(now - self._grace, granularity).isoformat()
+            )
+            logger.info(f"Rolled up {len(rows)} {granularity} trend counts")
+
+    async def _fill_ring(
+        self, granularity: str, rows: list[dict], now: datetime
+    ) -> None:
+        """
+        Overwrites the ring's closed buckets with their rolled up
+        counts. Increments made while a bucket was open only cover the
+        rows applied since the ring was last written, and as closed
+        buckets aren't incremented nothing is counted twice.
+        """
+        buckets: dict[datetime, dict[str, dict[str, int]]] = {}
+
+        for row in rows:
+            start: datetime = row["bucket_start"]
+            if (
+                not self._closed(granularity, start, now)
+                or self._expires_at(granularity, start) <= now
+            ):
+                continue
+
+            buckets.setdefault(start, {}).setdefault(row["dimension"], {})[
+                row["name"]
+            ] = row["count"]
+
+        if not buckets:
+            return
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for start, dimensions in buckets.items():
+                for dimension in DIMENSIONS:
+                    key: str = self._key(dimension, granularity, start)
+                    pipe.delete(key)
+                    if counts := dimensions.get(dimension):
+                        pipe.hset(key, mapping=counts)
+                        pipe.expireat(key, self._expires_at(granularity, start))
+            await pipe.execute()
+
+    async def query(
+        self, dimension: str, granularity: str, window: timedelta
+    ) -> list[tuple[datetime, dict[str, int]]]:
+        """
+        Returns the counts of every bucket within `window` of now,
+        oldest first, the last bucket being the one in progress.
+        """
+        size: timedelta = GRANULARITIES[granularity]
+        if window // size > MAX_BUCKETS:
+            raise ValueError(f"Window spans more than {MAX_BUCKETS} {granularity}s")
+
+        last: datetime = truncate(datetime.now(), granularity)
+        starts: list[datetime] = [
+            last - size * i for i in reversed(range(max(1, window // size)))
+        ]
+
+        buckets: dict[datetime, dict[str, int]] = {}
+
+        ring_floor: datetime = last - size * (RING_SIZES[granularity] - 1)
+        in_ring: list[datetime] = [s for s in starts if s >= ring_floor]
+        if in_ring:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for start in in_ring:
+                    pipe.hgetall(self._key(dimension, granularity, start))
+                replies: list[dict] = await pipe.execute()
+
+            for start, reply in zip(in_ring, replies):
+                if reply:
+                    buckets[start] = decode_counts(reply)
+
+        missing: list[datetime] = [s for s in starts if s not in buckets]
+        if missing:
+            async with get_db_session() as sess:
+                res = await sess.execute(
+                    select(
+                        TrendBucket.bucket_start, TrendBucket.name, TrendBucket.count
+                    ).where(
+                        TrendBucket.dimension == dimension,
+                        TrendBucket.granularity == granularity,
+                        TrendBucket.bucket_start.between(missing[0], missing[-1]),
+                    )
+                )
+
+                found: set[datetime] = set(buckets)
+                for start, name, count in res.all():
+                    if start not in found:
+                        buckets.setdefault(start, {})[name] = count
+
+        return [(start, buckets.get(start, {})) for start in starts]
@@ -59,3 +59,23 @@ PROGRAMMING_LANGUAGES = [
     "Visual Basic",
     "Zig",
 ]
+
+
+def decode_counts(counts: dict) -> dict[str, int]:
+    """Decodes the reply of HGETALL on a hash of counts."""
+    return {
+        (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in counts.items()
+    }
+
+
+# Lowercased languages also counted towards the name charted
+LANGUAGE_ALIASES: dict[str, str] = {"javascript": "typescript", "golang": "go"}
+
+
+def merge_aliases(counts: dict[str, int]) -> dict[str, int]:
+    """Folds the counts of lowercased language aliases into the names charted."""
+    for alias, name in LANGUAGE_ALIASES.items():
+        if name in counts:
+            counts[name] += counts.get(alias, 0)
+
+    return counts
@@ -1,13 +1,22 @@
-import json
 from typing import Optional
-from sqlalchemy import select, distinct, func
-
-from db_models import CleanedData
+from sqlalchemy import select, func
+
+from db_models import IndustrySalaryStats, LanguageSalaryStats
+from engine.chart_generator import (
+    industry_counts,
+    industry_counts_query,
+    plang_counts_query,
+)
+from engine.locations import LocationResolver
+from engine.quantile_sketch import QuantileSketch
+from engine.salary_rollup import ALL_LOCATIONS
+from engine.utils import merge_aliases
 from utils.db import get_db_session
 from .models import Row
 
 PAGE_SIZE = 10
-LANG_MAP: dict[str, list[float]] = {}
+
+locations = LocationResolver()
 
 
 def calc_pages(total_rows: int) -> int:
@@ -19,90 +28,91 @@ def calc_pages(total_rows: int) -> int:
 
 async def fetch_plang_chart_data() -> dict:
     async with get_db_session() as sess:
-        res = await sess.execute(select(distinct(CleanedData.programming_languages)))
-        data: list[tuple[str]] = res.all()
-
-    rtn_value: dict[str, int] = {}
-    for (item,) in data:
-        for key in json.loads(item):
-            key = key.lower()
-            rtn_value.setdefault(key, 0)
-            rtn_value[key] += 1
-
-    return rtn_value
+        res = await sess.execute(plang_counts_query())
+        return merge_aliases(dict(res.all()))
 
 
 async def fetch_industries_chart_data() -> dict:
     async with get_db_session() as sess:
-        res = await sess.execute(select(distinct(CleanedData.industry)))
-        data: list[tuple[str]] = res.all()
-
-    rtn_value: dict[str, int] = {}
-    for (ind,) in data:
-        rtn_value.setdefault(ind, 0)
-        rtn_value[ind] += 1
-
-    return rtn_value
+        res = await sess.execute(industry_counts_query())
+        return industry_counts(res.all())
+
+
+def salary_stats_query(
+    model: type[IndustrySalaryStats] | type[LanguageSalaryStats],
+    name_column: str,
+    location_id: int,
+):
+    return (
+        select(
+            getattr(model, name_column),
+            model.count,
+            model.salary_sum,
+            model.sketch,
+            func.count().over(),
+        )
+        .where(model.location_id == location_id)
+        .order_by(model.count.desc(), getattr(model, name_column))
+    )
+
+
+async def fetch_location_id(location: Optional[str]) -> Optional[int]:
+    """
+    Resolves a location typed by a user to the ID its stats are rolled
+    up under, None if no posting has been seen there. Locations are
+    matched on their canonical form, so "London, UK" and "Greater
+    London" are the same, and a region or country such as "UK" covers
+    the cities within it.
+    """
+    if location is None:
+        return ALL_LOCATIONS
 
+    async with get_db_session() as sess:
+        return await locations.location_id(sess, location)
 
-async def fetch_plang_table_data(
-    location: Optional[str] = None, page: Optional[int] = 0
-) -> tuple[tuple[Row], int]:
-    global LANG_MAP
 
-    if page == 0 or not LANG_MAP:
-        query = select(CleanedData.programming_languages, CleanedData.salary).where(
-            CleanedData.salary != None
+async def _fetch_salary_stats(
+    model: type[IndustrySalaryStats] | type[LanguageSalaryStats],
+    name_column: str,
+    location_id: int,
+    page: int,
+) -> tuple[tuple[Row, ...], int]:
+    """
+    Reads a page of a salary rollup in one indexed query, alongside
+    the total number of pages.
+    """
+    async with get_db_session() as sess:
+        res = await sess.execute(
+            salary_stats_query(model, name_column, location_id)
+            .offset(page * PAGE_SIZE)
+            .limit(PAGE_SIZE + 1)
+        )
+        rows = res.all()
+
+    result: list[Row] = []
+    for name, count, total, sketch, _ in rows:
+        quantiles = QuantileSketch.from_dict(sketch).quantiles()
+        result.append(
+            Row(
+                name=name,
+                average_salary=total / count,
+                median_salary=quantiles[0.5],
+                p25_salary=quantiles[0.25],
+                p75_salary=quantiles[0.75],
+                p90_salary=quantiles[0.9],
+            )
         )
 
-        if location is not None:
-            query = query.where(CleanedData.location.like(f"{location.strip()}"))
-
-        async with get_db_session() as sess:
-            res = await sess.stream(query)
+    return tuple(result), calc_pages(rows[0][4] if rows else 0)
 
-            async for langs, salary in res:
-                for lang in json.loads(langs):
-                    LANG_MAP.setdefault(lang.lower(), [])
-                    LANG_MAP[lang.lower()].append(salary)
 
-    return tuple(
-        Row(
-            name=key,
-            average_salary=sum(LANG_MAP[key]) / len(LANG_MAP[key]),
-            median_salary=LANG_MAP[key][len(LANG_MAP[key]) // 2],
-        )
-        for key in list(LANG_MAP.keys())[page * PAGE_SIZE : (page + 1) * PAGE_SIZE]
-    ), calc_pages(len(LANG_MAP))
+async def fetch_plang_table_data(
+    location_id: int = ALL_LOCATIONS, page: Optional[int] = 0
+) -> tuple[tuple[Row, ...], int]:
+    return await _fetch_salary_stats(LanguageSalaryStats, "language", location_id, page)
 
 
 async def fetch_industries_table_data(
-    location: Optional[str] = None, page: Optional[int] = 0
+    location_id: int = ALL_LOCATIONS, page: Optional[int] = 0
 ) -> tuple[tuple[Row, ...], int]:
-    query = select(
-        distinct(CleanedData.industry),
-        func.sum(CleanedData.salary) / func.count(CleanedData.industry),
-        func.percentile_cont(0.5).within_group(CleanedData.salary),
-    ).where(CleanedData.salary != None)
-
-    if location is not None:
-        query = query.where(CleanedData.location.like(location))
-    query = query.group_by(CleanedData.industry)
-
-    async with get_db_session() as sess:
-        data_result = await sess.stream(
-            query.offset(page * PAGE_SIZE).limit(PAGE_SIZE + 1)
-        )
-
-        result: list[Row] = []
-        async for name, avg_sal, med_sal in data_result:
-            if avg_sal and med_sal:
-                result.append(
-                    Row(name=name, average_salary=float(avg_sal), median_salary=med_sal)
-                )
-
-        row_count: int = (
-            await sess.execute(select(func.count()).select_from(query.subquery()))
-        ).first()[0]
-
-    return tuple(result), calc_pages(row_count)
+    return await _fetch_salary_stats(IndustrySalaryStats, "industry", location_id, page)
@@ -1,14 +1,25 @@
+from datetime import datetime
 from typing import Any, Iterable
 from routes.utils import CustomBase
 from pydantic import field_serializer
 
 
 class Row(CustomBase):
+    """
+    Salary stats of an industry or language. Percentiles are estimated
+    from a quantile sketch and are within 1% of the true value.
+    """
+
     name: str
     average_salary: float
     median_salary: float
+    p25_salary: float
+    p75_salary: float
+    p90_salary: float
 
-    @field_serializer("average_salary", "median_salary")
+    @field_serializer(
+        "average_salary", "median_salary", "p25_salary", "p75_salary", "p90_salary"
+    )
     def serialize_floats(self, value: float) -> str:
         reversed_value: list[str] = list(str(round(value))[::-1])
 
@@ -24,4 +35,15 @@ class PaginatedResponse(CustomBase):
     has_next_page: bool
     
 class MaxPagesPaginatedResponse(PaginatedResponse):
-    max_pages: int
\ No newline at end of file
+    max_pages: int
+
+
+class TrendBucketRow(CustomBase):
+    start: datetime
+    counts: dict[str, int]
+
+
+class TrendsResponse(CustomBase):
+    window: str
+    granularity: str
+    data: list[TrendBucketRow]
@@ -1,28 +1,46 @@
 import json
 
-from fastapi import APIRouter
-from typing import Optional
+from datetime import timedelta
+from fastapi import APIRouter, HTTPException
+from typing import Awaitable, Callable, Literal, Optional
 
 from config import (
     INDUSTRY_BAR_CHART_KEY,
-    INDUSTRY_TABLE_KEY,
+    INDUSTRY_COUNTS_KEY,
     PLANG_BAR_CHART_KEY,
-    PLANG_TABLE_KEY,
+    PLANG_COUNTS_KEY,
     REDIS_CLIENT,
+    TRENDS_CACHE_CHANNEL,
+    TRENDS_CACHE_VERSION_KEY,
 )
+from engine.response_cache import ResponseCache
+from engine.trends import TrendBuckets, parse_window
+from engine.utils import decode_counts
 from .controllers import (
     fetch_industries_chart_data,
     fetch_industries_table_data,
+    fetch_location_id,
     fetch_plang_chart_data,
     fetch_plang_table_data,
 )
-from .models import MaxPagesPaginatedResponse
+from .models import MaxPagesPaginatedResponse, Row, TrendBucketRow, TrendsResponse
 
 root = APIRouter(prefix="", tags=["root"])
+trends = TrendBuckets()
+tables_cache = ResponseCache()
+# Trends have their own version, bumped once the chart generator has
+# applied a batch rather than when the cleaner commits it
+trends_cache = ResponseCache(
+    version_key=TRENDS_CACHE_VERSION_KEY, channel=TRENDS_CACHE_CHANNEL
+)
 
 
 @root.get("/programming-languages-chart")
 async def programming_languages_chart() -> dict:
+    counts: dict = await REDIS_CLIENT.hgetall(PLANG_COUNTS_KEY)
+    if counts:
+        return decode_counts(counts)
+
     prev: Optional[bytes] = await REDIS_CLIENT.get(PLANG_BAR_CHART_KEY)
     if prev:
         return json.loads(prev)
@@ -34,6 +52,10 @@ async def programming_languages_chart() -> dict:
 
 @root.get("/industries-chart")
 async def industries() -> dict:
+    counts: dict = await REDIS_CLIENT.hgetall(INDUSTRY_COUNTS_KEY)
+    if counts:
+        return decode_counts(counts)
+
     prev: Optional[bytes] = await REDIS_CLIENT.get(INDUSTRY_BAR_CHART_KEY)
     if prev:
         return json.loads(prev)
@@ -43,22 +65,36 @@ async def industries() -> dict:
     return data
 
 
+async def _table(
+    name: str,
+    fetch: Callable[[int, int], Awaitable[tuple[tuple[Row, ...], int]]],
+    location: Optional[str],
+    page: int,
+) -> dict:
+    # Looked up by the location as typed, so cached pages cost no query,
+    # and unknown locations are cached empty like any other response.
+    # Entries are held in process up to the cache's max_size and in
+    # Redis until expiry
+    async def compute() -> dict:
+        location_id: Optional[int] = await fetch_location_id(location)
+        if location_id is None:
+            return MaxPagesPaginatedResponse(
+                data=[], has_next_page=False, max_pages=0
+            ).model_dump(mode="json")
+
+        rows, max_pages = await fetch(location_id, page)
+        return MaxPagesPaginatedResponse(
+            data=rows[:10], has_next_page=len(rows) > 10, max_pages=max_pages
+        ).model_dump(mode="json")
+
+    return await tables_cache.get(ResponseCache.key_for(name, location, page), compute)
+
+
 @root.get("/programming-languages")
 async def programming_languages(
     location: Optional[str] = None, page: Optional[int] = 0
 ) -> MaxPagesPaginatedResponse | dict:
-    key = f"{PLANG_TABLE_KEY}:{location}:{page}"
-
-    prev: Optional[bytes] = await REDIS_CLIENT.get(key)
-    if prev is not None:
-        return json.loads(prev)
-
-    rows, max_pages = await fetch_plang_table_data(location, page)
-    rtn = MaxPagesPaginatedResponse(
-        data=rows[:10], has_next_page=len(rows) > 10, max_pages=max_pages
-    )
-    await REDIS_CLIENT.set(key, json.dumps(rtn.model_dump()))
-    return rtn
+    return await _table("plang_table", fetch_plang_table_data, location, page)
 
 
 @root.get("/industries")
@@ -66,15 +102,48 @@ async def industries(
     location: Optional[str] = None,
     page: Optional[int] = 0,
 ) -> MaxPagesPaginatedResponse | dict:
-    key = f"{INDUSTRY_TABLE_KEY}:{location}:{page}"
-
-    prev: Optional[bytes] = await REDIS_CLIENT.get(key)
-    if prev is not None:
-        return json.loads(prev)
-
-    rows, max_pages = await fetch_industries_table_data(location, page)
-    rtn = MaxPagesPaginatedResponse(
-        data=rows[:10], has_next_page=len(rows) > 10, max_pages=max_pages
-    )
-    await REDIS_CLIENT.set(key, json.dumps(rtn.model_dump()))
-    return rtn
+    return await _table("industry_table", fetch_industries_table_data, location, page)
+
+
+async def _trends(dimension: str, window: str, granularity: str) -> dict:
+    try:
+        span: timedelta = parse_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def compute() -> dict:
+        buckets = await trends.query(dimension, granularity, span)
+        return TrendsResponse(
+            window=window,
+            granularity=granularity,
+            data=[
+                TrendBucketRow(start=start, counts=counts) for start, counts in buckets
+            ],
+        ).model_dump(mode="json")
+
+    try:
+        data: dict = await trends_cache.get(
+            ResponseCache.key_for(
+                f"{dimension}_trends", span.total_seconds(), granularity
+            ),
+            compute,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Windows spelt differently share an entry
+    return {**data, "window": window}
+
+
+@root.get("/trends/programming-languages")
+async def programming_languages_trends(
+    window: str = "7d", granularity: Literal["hour", "day"] = "day"
+) -> TrendsResponse:
+    return await _trends("plang", window, granularity)
+
+
+@root.get("/trends/industries")
+async def industries_trends(
+    window: str = "7d", granularity: Literal["hour", "day"] = "day"
+) -> TrendsResponse:
+    return await _trends("industry", window, granularity)
@@ -0,0 +1,150 @@
+import logging
+
+from sqlalchemy import Table, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Optional, Sequence
+
+from config import BULK_INSERT_BATCH_SIZE, BULK_INSERT_COPY_THRESHOLD
+
+
+logger = logging.getLogger(__name__)
+
+# Bind parameters Postgres accepts in a single statement
+MAX_PARAMETERS = 32767
+
+
+def _columns(table: Table) -> list[str]:
+    """Every column besides the one filled in by a sequence."""
+    return [c.name for c in table.columns if c is not table.autoincrement_column]
+
+
+def _insert_batch_size(table: Table, batch_size: int) -> int:
+    return max(1, min(batch_size, MAX_PARAMETERS // len(table.columns)))
+
+
+def _records(table: Table, rows: Sequence[dict]) -> list[tuple]:
+    """
+    Orders each row by the table's columns, filling in Python side
+    defaults as COPY bypasses them.
+    """
+    defaults: dict[str, Any] = {}
+    for column in table.columns:
+        if column is table.autoincrement_column or column.default is None:
+            continue
+        default = column.default
+        defaults[column.name] = default.arg(None) if default.is_callable else default.arg
+
+    columns: list[str] = _columns(table)
+    return [
+        tuple(row[c] if c in row else defaults.get(c) for c in columns)
+        for row in rows
+    ]
+
+
+async def _driver_connection(sess: AsyncSession) -> Optional[Any]:
+    conn = await sess.connection()
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection
+    return driver if hasattr(driver, "copy_records_to_table") else None
+
+
+async def bulk_insert(
+    sess: AsyncSession,
+    table: Table,
+    rows: Sequence[dict],
+    *,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+    copy_threshold: int = BULK_INSERT_COPY_THRESHOLD,
+) -> None:
+    """
+    Inserts rows into `table`, with COPY when there are at least
+    `copy_threshold` of them and a multi-row INSERT otherwise.
+    """
+    if not rows:
+        return
+
+    driver = await _driver_connection(sess)
+
+    if driver is None or len(rows) < copy_threshold:
+        size: int = _insert_batch_size(table, batch_size)
+        for i in range(0, len(rows), size):
+            await sess.execute(insert(table).values(rows[i : i + size]))
+        return
+
+    columns: list[str] = _columns(table)
+    records: list[tuple] = _records(table, rows)
+
+    for i in range(0, len(records), batch_size):
+        await driver.copy_records_to_table(
+            table.name, records=records[i : i + batch_size], columns=columns
+        )
+
+
+async def bulk_upsert(
+    sess: AsyncSession,
+    table: Table,
+    rows: Sequence[dict],
+    conflict_columns: Sequence[str],
+    *,
+    returning: Optional[Sequence[str]] = None,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+    copy_threshold: int = BULK_INSERT_COPY_THRESHOLD,
+) -> list[dict]:
+    """
+    Inserts rows into `table`, skipping any which conflict on
+    `conflict_columns`. Large batches are copied into a temporary
+    staging table and moved across with a single INSERT ... SELECT.
+    Returns the `returning` columns, the conflict columns by default,
+    of the rows which were actually inserted.
+    """
+    if not rows:
+        return []
+
+    returning = list(returning or conflict_columns)
+
+    driver = await _driver_connection(sess)
+
+    if driver is None or len(rows) < copy_threshold:
+        size: int = _insert_batch_size(table, batch_size)
+        inserted: list[dict] = []
+        for i in range(0, len(rows), size):
+            res = await sess.execute(
+                pg_insert(table)
+                .values(rows[i : i + size])
+                .on_conflict_do_nothing(index_elements=conflict_columns)
+                .returning(*(table.c[c] for c in returning))
+            )
+            inserted.extend(dict(row) for row in res.mappings())
+        return inserted
+
+    columns: list[str] = _columns(table)
+    column_list: str = ", ".join(f'"{c}"' for c in columns)
+    returning_list: str = ", ".join(f'"{c}"' for c in returning)
+    staging: str = f"{table.name}_staging"
+
+    await driver.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS "
+        f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+    )
+
+    records: list[tuple] = _records(table, rows)
+    for i in range(0, len(records), batch_size):
+        await driver.copy_records_to_table(
+            staging, records=records[i : i + batch_size], columns=columns
+        )
+
+    res = await driver.fetch(
+        f"INSERT INTO {table.name} ({column_list}) "
+        f"SELECT DISTINCT ON ({', '.join(conflict_columns)}) {column_list} "
+        f"FROM {staging} "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING "
+        f"RETURNING {returning_list}"
+    )
+    await driver.execute(f"TRUNCATE {staging}")
+
+    inserted: list[dict] = [dict(record) for record in res]
+    logger.debug(
+        f"Copied {len(records)} rows into {table.name}, {len(inserted)} inserted"
+    )
+    return inserted
@@ -0,0 +1,59 @@
+import logging
+
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from config import CLEANED_DATA_PARTITIONS_AHEAD
+
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_y{start:%Y}m{start:%m}"
+
+
+async def ensure_partitions(
+    sess: AsyncSession,
+    table: str = "cleaned_data",
+    *,
+    since: Optional[datetime] = None,
+    ahead: int = CLEANED_DATA_PARTITIONS_AHEAD,
+) -> None:
+    """
+    Creates the monthly partitions of `table` from the month of `since`,
+    now by default, to `ahead` months from now. Partitions are created
+    ahead of time because a range can't be split out of the default
+    partition once rows land in it.
+    """
+    # Serialises concurrent callers, released when `sess` commits
+    await sess.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {"table": table}
+    )
+
+    start: datetime = month_start(since or datetime.now())
+    end: datetime = add_months(month_start(datetime.now()), ahead + 1)
+
+    while start < end:
+        following: datetime = add_months(start, 1)
+        await sess.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} "
+                f"PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+            )
+        )
+        start = following
+
+    logger.info(f"Partitions of {table} ensured up to {end:%Y-%m}")